@@ -0,0 +1,30 @@
+"""Add version column to Item for ETags and optimistic locking
+
+Revision ID: 5b6a9d1c2e47
+Revises: 1a31ce608336
+Create Date: 2026-10-18 11:02:09.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5b6a9d1c2e47'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at version 1, like new ones
+    op.add_column(
+        "item",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.alter_column("item", "version", server_default=None)
+
+
+def downgrade():
+    op.drop_column("item", "version")
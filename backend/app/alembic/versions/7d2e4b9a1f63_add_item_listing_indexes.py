@@ -0,0 +1,38 @@
+"""Add composite indexes for the item listing filters and sorts
+
+Revision ID: 7d2e4b9a1f63
+Revises: c3f1a8d27b94
+Create Date: 2026-10-18 15:08:12.734520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e4b9a1f63'
+down_revision = 'c3f1a8d27b94'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    # item.owner_id had no index, listing the items of a user scanned the table
+    "ix_item_owner_id_id": ["owner_id", "id"],
+    "ix_item_owner_id_title_id": ["owner_id", "title", "id"],
+    "ix_item_title_id": ["title", "id"],
+}
+
+
+def upgrade():
+    # Built without locking the table against writes on PostgreSQL, which needs
+    # to run outside of the migration transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(name, "item", columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name="item", postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""Add GIN index for the full-text search of items
+
+Revision ID: c3f1a8d27b94
+Revises: 5b6a9d1c2e47
+Create Date: 2026-10-18 14:21:47.106395
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a8d27b94'
+down_revision = '5b6a9d1c2e47'
+branch_labels = None
+depends_on = None
+
+# Must stay identical to app.models.item_search_vector, or searches won't use it
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Built without locking the table against writes, which needs to run
+    # outside of the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_item_search",
+            "item",
+            # Expressions other than a function call need their own parentheses
+            [sa.text(f"({SEARCH_VECTOR})")],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_item_search", table_name="item", postgresql_concurrently=True
+        )
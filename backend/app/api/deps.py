@@ -1,16 +1,21 @@
-from collections.abc import Generator
+import math
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import cache_user, invalidate_user, user_cache
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
+from app.core.replicas import PRIMARY_COOKIE, read_router
+from app.core.throttle import login_throttle
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -23,11 +28,26 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # Objects are returned after the commit, avoid lazy loads outside the greenlet
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # A replica unless this client wrote recently, see StickyPrimaryMiddleware
+    with read_router.engine(primary=PRIMARY_COOKIE in request.cookies) as bind:
+        async with AsyncSession(bind) as session:
+            yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+async def get_current_user(session: AsyncSessionDep, token: TokenDep) -> User:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -38,7 +58,32 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    user: User | None = None
+    cached_user = user_cache.get(token_data.sub) if token_data.sub else None
+    if cached_user:
+        # Another worker may have deactivated, demoted or given a new password
+        # to the user since it was cached, read those columns by primary key
+        access = (
+            await session.exec(
+                select(User.is_active, User.is_superuser, User.hashed_password).where(
+                    col(User.id) == cached_user.id
+                )
+            )
+        ).first()
+        cached_access = (
+            cached_user.is_active,
+            cached_user.is_superuser,
+            cached_user.hashed_password,
+        )
+        if access is not None and tuple(access) == cached_access:
+            # Attach a copy to this session without loading the whole row
+            user = await session.merge(cached_user, load=False)
+        else:
+            invalidate_user(cached_user.id)
+    if not user:
+        user = await session.get(User, token_data.sub)
+        if user:
+            cache_user(user)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -55,3 +100,18 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def throttle_login(
+    request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> None:
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return
+    ip = request.client.host if request.client else ""
+    wait = await login_throttle.check(ip=ip, account=form_data.username)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
@@ -0,0 +1,17 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core instead of the standard library.
+
+    Return one with a response model instance, e.g. a page of a list endpoint,
+    to skip FastAPI dumping the model and validating it again against the
+    route `response_model`. The model is serialized straight to bytes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
@@ -1,102 +1,307 @@
-from typing import Any
+import csv
+import io
+from collections.abc import AsyncGenerator
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, literal, not_, tuple_
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import AsyncSessionDep, CurrentUser, ReadSessionDep
+from app.api.responses import FastJSONResponse
+from app.core.compression import skip_compression
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models import (
+    Cursor,
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsCreated,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
+from app.utils import decode_cursor, encode_cursor, etag_matches, make_etag
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = list(ItemPublic.model_fields)
+
+ItemSort = Literal["id", "-id", "title", "-title"]
+
 
 @router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def read_items(
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_count: bool = True,
+    estimate_count: bool = False,
+    title_prefix: Annotated[str | None, Query(min_length=1, max_length=255)] = None,
+    has_description: bool | None = None,
+    owner_id: int | None = None,
+    sort: ItemSort = "id",
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> Any:
     """
     Retrieve items.
+
+    Filter them by `title_prefix`, by whether they have a description, and for
+    superusers by `owner_id`. `sort` is one of `id`, `title`, or either one
+    prefixed with `-` for descending order.
+
+    Pass the `next_cursor` of a page as `cursor` to get the next one, with the
+    same filters and sort, unlike `skip` this stays fast however deep you page.
+    Counting is a scan of every matching row: skip it with `include_count=false`
+    or use the planner estimate with `estimate_count=true`, `count_exact` tells
+    which one you got.
+
+    The page ETag comes from the item ids and row versions, send it back in
+    `If-None-Match` to get a 304 when nothing changed.
     """
+    by_title = sort.lstrip("-") == "title"
+    after = decode_cursor(cursor) if cursor else None
+    if cursor and (not after or (by_title and after.title is None)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
+    statement = select(Item)
+    if not current_user.is_superuser:
+        if owner_id is not None and owner_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        owner_id = current_user.id
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    if title_prefix:
+        statement = statement.where(
+            col(Item.title).startswith(title_prefix, autoescape=True)
+        )
+    if has_description is not None:
+        has_one = and_(col(Item.description).is_not(None), col(Item.description) != "")
+        statement = statement.where(has_one if has_description else not_(has_one))
+    count, count_exact = None, False
+    if include_count:
+        count, count_exact = await crud.async_count_rows(
+            session=session, statement=statement, estimate=estimate_count
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    # Sorted by the columns of an (owner_id, ..., id) or (..., id) index, the id
+    # breaking ties so the cursor can seek past the last row of the page
+    columns = [col(Item.title), col(Item.id)] if by_title else [col(Item.id)]
+    descending = sort.startswith("-")
+    if after:
+        seek = tuple_(*columns)
+        values = [after.title, after.id] if by_title else [after.id]
+        last = tuple_(*(literal(value) for value in values))
+        statement = statement.where(seek < last if descending else seek > last)
+    statement = statement.order_by(
+        *(column.desc() if descending else column for column in columns)
+    )
+    items = (await session.exec(statement.offset(skip).limit(limit))).all()
+
+    next_cursor = None
+    if items and len(items) == limit:
+        last_item = items[-1]
+        title = last_item.title if by_title else None
+        next_cursor = encode_cursor(Cursor(id=last_item.id, title=title))
+    etag = make_etag(
+        count, count_exact, next_cursor, [(item.id, item.version) for item in items]
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    page = ItemsPublic(
+        data=items, count=count, count_exact=count_exact, next_cursor=next_cursor
+    )
+    return FastJSONResponse(page, headers={"ETag": etag})
+
+
+async def stream_items(
+    statement: SelectOfScalar[Item], format: Literal["ndjson", "csv"]
+) -> AsyncGenerator[str, None]:
+    # The request session is closed before the body is sent, stream from our own
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream_scalars(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
         )
-        items = session.exec(statement).all()
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        if format == "csv":
+            writer.writeheader()
+        async for items in result.partitions():
+            for item in items:
+                row = ItemPublic.model_validate(item)
+                if format == "csv":
+                    writer.writerow(row.model_dump())
+                else:
+                    buffer.write(row.model_dump_json() + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+@router.get("/export", response_class=StreamingResponse)
+@skip_compression
+async def export_items(
+    current_user: CurrentUser, format: Literal["ndjson", "csv"] = "ndjson"
+) -> StreamingResponse:
+    """
+    Export items as NDJSON or CSV.
+
+    Rows are read from a server-side cursor and streamed in batches, so memory
+    use doesn't grow with the number of items. Superusers export all items.
+    Sent uncompressed, so each batch reaches the client as soon as it's read.
+    """
+    statement = select(Item).order_by(col(Item.id))
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(stream_items(statement, format), media_type=media_type)
 
-    return ItemsPublic(data=items, count=count)
+
+@router.get("/search", response_model=ItemsPublic)
+async def search_items(
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    q: Annotated[str, Query(min_length=1, max_length=255)],
+    skip: int = 0,
+    limit: int = 100,
+    include_count: bool = True,
+) -> Any:
+    """
+    Search items by title and description, best matches first.
+
+    `q` accepts web search syntax: "quoted phrases", `or`, and `-word` to
+    exclude a word. Superusers search all items, others only their own.
+    """
+    statement = select(Item)
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    statement = crud.search_items(
+        statement=statement, query=q, dialect=session.get_bind().dialect.name
+    )
+    count, count_exact = None, False
+    if include_count:
+        count, count_exact = await crud.async_count_rows(
+            session=session, statement=statement.order_by(None)
+        )
+    items = (await session.exec(statement.offset(skip).limit(limit))).all()
+    page = ItemsPublic(data=items, count=count, count_exact=count_exact)
+    return FastJSONResponse(page)
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: int) -> Any:
+async def read_item(
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    response: Response,
+    id: int,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Get item by ID.
+
+    The ETag follows the item row version, send it back in `If-None-Match` to
+    get a 304 when the item didn't change.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    etag = make_etag(item.id, item.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return item
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+async def create_item(
+    *, session: AsyncSessionDep, current_user: CurrentUser, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-    return item
+    assert current_user.id is not None
+    return await crud.async_create_item(
+        session=session, item_in=item_in, owner_id=current_user.id
+    )
+
+
+@router.post("/bulk", response_model=ItemsCreated)
+async def create_items(
+    *, session: AsyncSessionDep, current_user: CurrentUser, items_in: list[ItemCreate]
+) -> Any:
+    """
+    Create many items in one transaction.
+    """
+    if len(items_in) > settings.ITEMS_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items, at most {settings.ITEMS_BULK_MAX_SIZE} per request",
+        )
+    assert current_user.id is not None
+    ids = await crud.async_create_items(
+        session=session, items_in=items_in, owner_id=current_user.id
+    )
+    return ItemsCreated(ids=ids)
 
 
 @router.put("/{id}", response_model=ItemPublic)
-def update_item(
-    *, session: SessionDep, current_user: CurrentUser, id: int, item_in: ItemUpdate
+async def update_item(
+    *,
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    response: Response,
+    id: int,
+    item_in: ItemUpdate,
+    if_match: Annotated[str | None, Header()] = None,
 ) -> Any:
     """
     Update an item.
+
+    Send the item ETag in `If-Match` to only update it if nobody changed it since.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    current_etag = make_etag(item.id, item.version)
+    if if_match and not etag_matches(if_match, current_etag, weak=False):
+        raise HTTPException(status_code=412, detail="Item was modified")
     update_dict = item_in.model_dump(exclude_unset=True)
     item.sqlmodel_update(update_dict)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    try:
+        await session.commit()
+    except StaleDataError:
+        # Updated by another request between our read and write
+        raise HTTPException(status_code=412, detail="Item was modified")
+    await session.refresh(item)
+    response.headers["ETag"] = make_etag(item.id, item.version)
     return item
 
 
 @router.delete("/{id}")
-def delete_item(session: SessionDep, current_user: CurrentUser, id: int) -> Message:
+async def delete_item(
+    session: AsyncSessionDep, current_user: CurrentUser, id: int
+) -> Message:
     """
     Delete an item.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
     return Message(message="Item deleted successfully")
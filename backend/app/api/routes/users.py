@@ -1,17 +1,21 @@
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlmodel import col, delete, select
 
 from app import crud
 from app.api.deps import (
+    AsyncSessionDep,
     CurrentUser,
-    SessionDep,
+    ReadSessionDep,
     get_current_active_superuser,
 )
+from app.api.responses import FastJSONResponse
+from app.core.cache import invalidate_user
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import async_get_password_hash, async_verify_password
 from app.models import (
+    Cursor,
     Item,
     Message,
     UpdatePassword,
@@ -23,7 +27,14 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import (
+    decode_cursor,
+    email_dispatcher,
+    encode_cursor,
+    etag_matches,
+    generate_new_account_email,
+    make_etag,
+)
 
 router = APIRouter()
 
@@ -33,40 +44,66 @@ router = APIRouter()
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+    session: ReadSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_count: bool = True,
+    estimate_count: bool = False,
+) -> Any:
     """
     Retrieve users.
-    """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    Pass the `next_cursor` of a page as `cursor` to get the next one, unlike
+    `skip` this stays fast however deep you page. Counting is a scan of every
+    row: skip it with `include_count=false` or use the planner estimate with
+    `estimate_count=true`, `count_exact` tells which one you got.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if cursor and not after:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    statement = select(User)
+    count, count_exact = None, False
+    if include_count:
+        count, count_exact = await crud.async_count_rows(
+            session=session, statement=statement, estimate=estimate_count
+        )
+    if after:
+        statement = statement.where(col(User.id) > after.id)
+    statement = statement.order_by(col(User.id)).offset(skip).limit(limit)
+    users = (await session.exec(statement)).all()
 
-    return UsersPublic(data=users, count=count)
+    next_cursor = None
+    if users and len(users) == limit:
+        next_cursor = encode_cursor(Cursor(id=users[-1].id))
+    page = UsersPublic(
+        data=users, count=count, count_exact=count_exact, next_cursor=next_cursor
+    )
+    return FastJSONResponse(page)
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, session: AsyncSessionDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await crud.async_get_user_by_email(session=session, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
+    user = await crud.async_create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        email_dispatcher.enqueue(
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -75,15 +112,17 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
 
 
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
-    *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
+async def update_user_me(
+    *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: CurrentUser
 ) -> Any:
     """
     Update own user.
     """
 
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.async_get_user_by_email(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
@@ -91,41 +130,63 @@ def update_user_me(
     user_data = user_in.model_dump(exclude_unset=True)
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    await session.refresh(current_user)
+    invalidate_user(current_user.id)
     return current_user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
-    *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
+async def update_password_me(
+    *, session: AsyncSessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    # current_user may come from the user cache, check the stored hash
+    await session.refresh(current_user)
+    if not await async_verify_password(
+        body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await async_get_password_hash(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await session.commit()
+    invalidate_user(current_user.id)
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(
+    current_user: CurrentUser,
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Get current user.
+
+    Send the ETag back in `If-None-Match` to get a 304 when nothing changed.
     """
+    etag = make_etag(
+        current_user.id,
+        current_user.email,
+        current_user.full_name,
+        current_user.is_active,
+        current_user.is_superuser,
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return current_user
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(session: AsyncSessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
     """
@@ -134,14 +195,15 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
     statement = delete(Item).where(col(Item.owner_id) == current_user.id)
-    session.exec(statement)  # type: ignore
-    session.delete(current_user)
-    session.commit()
+    await session.exec(statement)  # type: ignore
+    await session.delete(current_user)
+    await session.commit()
+    invalidate_user(current_user.id)
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
@@ -150,26 +212,26 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
             status_code=403,
             detail="Open user registration is forbidden on this server",
         )
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await crud.async_get_user_by_email(session=session, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    user = await crud.async_create_user(session=session, user_create=user_create)
     return user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-def read_user_by_id(
-    user_id: int, session: SessionDep, current_user: CurrentUser
+async def read_user_by_id(
+    user_id: int, session: ReadSessionDep, current_user: CurrentUser
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
+    user = await session.get(User, user_id)
+    if user and user.id == current_user.id:
         return user
     if not current_user.is_superuser:
         raise HTTPException(
@@ -184,9 +246,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: int,
     user_in: UserUpdate,
 ) -> Any:
@@ -194,31 +256,35 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.async_get_user_by_email(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    db_user = await crud.async_update_user(
+        session=session, db_user=db_user, user_in=user_in
+    )
     return db_user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
-def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: int
+async def delete_user(
+    session: AsyncSessionDep, current_user: CurrentUser, user_id: int
 ) -> Message:
     """
     Delete a user.
     """
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user == current_user:
@@ -226,7 +292,8 @@ def delete_user(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
     statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
+    await session.exec(statement)  # type: ignore
+    await session.delete(user)
+    await session.commit()
+    invalidate_user(user_id)
     return Message(message="User deleted successfully")
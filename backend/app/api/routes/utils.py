@@ -1,9 +1,23 @@
+import os
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models import Message
-from app.utils import generate_test_email, send_email
+from app.core.cache import user_cache
+from app.core.db import async_engine, engine, replica_engines
+from app.core.pool import pool_stats
+from app.core.slow_queries import slow_query_log
+from app.models import (
+    CacheStats,
+    EmailDeliveryPublic,
+    Message,
+    PoolsStats,
+    SlowQueries,
+    SlowQueryFingerprintPublic,
+    SlowQueryPublic,
+)
+from app.utils import email_dispatcher, generate_test_email
 
 router = APIRouter()
 
@@ -18,9 +32,83 @@ def test_email(email_to: EmailStr) -> Message:
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    email_dispatcher.enqueue(
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
     return Message(message="Test email sent")
+
+
+@router.get(
+    "/user-cache/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_user_cache_stats() -> CacheStats:
+    """
+    Hit and miss counters of the authenticated user cache.
+    """
+    return CacheStats(
+        hits=user_cache.hits,
+        misses=user_cache.misses,
+        size=len(user_cache),
+        max_size=user_cache.max_size,
+    )
+
+
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_db_pool_stats() -> PoolsStats:
+    """
+    Connections of the database pools of the worker process serving this request.
+
+    Each worker has its own pools, `pid` tells which one answered. A growing
+    `overflow` or waits in the upper histogram buckets mean the pool is too small
+    for the load, `timeouts` are checkouts that gave up after `timeout` seconds.
+    """
+    pools = [pool_stats("sync", engine), pool_stats("async", async_engine)]
+    pools += [
+        pool_stats(f"replica-{index}", replica_engine)
+        for index, replica_engine in enumerate(replica_engines)
+    ]
+    return PoolsStats(pid=os.getpid(), pools=pools)
+
+
+@router.get(
+    "/slow-queries/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_slow_queries(limit: int = 20) -> SlowQueries:
+    """
+    The `limit` slowest query fingerprints by total time, and the latest slow
+    statements, newest first, as seen by the worker process serving this request.
+
+    Empty unless `SLOW_QUERY_THRESHOLD` is set.
+    """
+    return SlowQueries(
+        threshold=slow_query_log.threshold,
+        fingerprints=[
+            SlowQueryFingerprintPublic.model_validate(entry, from_attributes=True)
+            for entry in slow_query_log.top(limit)
+        ],
+        recent=[
+            SlowQueryPublic.model_validate(query, from_attributes=True)
+            for query in slow_query_log.latest()
+        ],
+    )
+
+
+@router.get(
+    "/email-deliveries/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_email_deliveries() -> list[EmailDeliveryPublic]:
+    """
+    Status of the latest emails sent in the background, newest first.
+    """
+    return [
+        EmailDeliveryPublic.model_validate(delivery, from_attributes=True)
+        for delivery in reversed(email_dispatcher.log)
+    ]
@@ -0,0 +1,343 @@
+"""
+Load test of the API: login, GET /items/ at several page sizes, creating,
+reading, updating and deleting items, and GET /users/. The app runs in this
+process through ASGITransport, or over HTTP in uvicorn started on a free local
+port. Users and items are generated from --seed, so runs with the same seed see
+the same data, and are deleted afterwards. Throughput and p50/p95/p99 latency of
+each scenario are written as JSON.
+
+    python -m app.benchmarks.api --target asgi --output asgi.json
+    python -m app.benchmarks.api --target uvicorn --workers 2 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from sqlmodel import col, delete, insert, select
+
+from app.benchmarks.utils import LoadResult, run_calls, run_load
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.security import get_password_hash
+from app.models import Item, User
+
+PASSWORD = "benchmark-password"
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey"
+).split()
+
+
+@dataclass
+class SeedData:
+    email_prefix: str
+    emails: list[str]
+    items: int
+
+
+def generate_rows(
+    seed: int, users: int, items_per_user: int
+) -> tuple[list[dict[str, Any]], list[list[dict[str, Any]]]]:
+    """
+    User rows and, for each user, its item rows. Only depends on the arguments.
+    """
+    rng = random.Random(seed)
+    user_rows = [
+        {
+            "email": f"bench-{seed}-{i}@example.com",
+            "full_name": " ".join(rng.choices(WORDS, k=2)).title(),
+            "is_active": True,
+            "is_superuser": False,
+        }
+        for i in range(users)
+    ]
+    item_rows = [
+        [
+            {
+                "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 4))),
+                "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 20)))
+                or None,
+            }
+            for _ in range(items_per_user)
+        ]
+        for _ in range(users)
+    ]
+    return user_rows, item_rows
+
+
+async def clear(email_prefix: str) -> None:
+    async with async_engine.begin() as connection:
+        owners = select(User.id).where(col(User.email).startswith(email_prefix))
+        await connection.execute(delete(Item).where(col(Item.owner_id).in_(owners)))
+        await connection.execute(
+            delete(User).where(col(User.email).startswith(email_prefix))
+        )
+
+
+async def seed_database(seed: int, users: int, items_per_user: int) -> SeedData:
+    email_prefix = f"bench-{seed}-"
+    await clear(email_prefix)
+    user_rows, item_rows = generate_rows(seed, users, items_per_user)
+    # One bcrypt hash shared by every user, hashing each would take longer than the run
+    hashed_password = get_password_hash(PASSWORD)
+    async with async_engine.begin() as connection:
+        ids = (
+            await connection.execute(
+                insert(User).returning(col(User.id)),
+                [{**row, "hashed_password": hashed_password} for row in user_rows],
+            )
+        ).scalars()
+        rows = [
+            {**row, "owner_id": owner_id}
+            for owner_id, items in zip(ids, item_rows, strict=True)
+            for row in items
+        ]
+        if rows:
+            await connection.execute(insert(Item), rows)
+    return SeedData(
+        email_prefix=email_prefix,
+        emails=[row["email"] for row in user_rows],
+        items=len(rows),
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+@asynccontextmanager
+async def asgi_client() -> AsyncIterator[httpx.AsyncClient]:
+    from app.main import app
+
+    # Logins of the benchmark users would soon be throttled
+    settings.LOGIN_THROTTLE_ENABLED = False
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        yield c
+
+
+@asynccontextmanager
+async def uvicorn_client(workers: int) -> AsyncIterator[httpx.AsyncClient]:
+    port = free_port()
+    env = {**os.environ, "LOGIN_THROTTLE_ENABLED": "false"}
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    limits = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as c:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    r = await c.get(f"{settings.API_V1_STR}/openapi.json")
+                    if r.status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            yield c
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> dict[str, str]:
+    r = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def run_scenarios(
+    c: httpx.AsyncClient,
+    data: SeedData,
+    *,
+    requests: int,
+    login_requests: int,
+    concurrency: int,
+    page_sizes: list[int],
+) -> list[LoadResult]:
+    api = settings.API_V1_STR
+    superuser = await login(
+        c, settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD
+    )
+    user = await login(c, data.emails[0], PASSWORD)
+    results = []
+
+    def post_login(i: int) -> Callable[[], Awaitable[httpx.Response]]:
+        form = {"username": data.emails[i % len(data.emails)], "password": PASSWORD}
+        return lambda: c.post(f"{api}/login/access-token", data=form)
+
+    results.append(
+        await run_calls(
+            "POST /login/access-token",
+            [post_login(i) for i in range(login_requests)],
+            concurrency=concurrency,
+        )
+    )
+    for size in page_sizes:
+        results.append(
+            await run_load(
+                c,
+                f"GET /items/?limit={size}",
+                "GET",
+                f"{api}/items/",
+                requests=requests,
+                concurrency=concurrency,
+                params={"limit": size},
+                headers=superuser,
+            )
+        )
+    results.append(
+        await run_load(
+            c,
+            "GET /users/?limit=100",
+            "GET",
+            f"{api}/users/",
+            requests=requests,
+            concurrency=concurrency,
+            params={"limit": 100},
+            headers=superuser,
+        )
+    )
+
+    ids: list[int] = []
+
+    def post_item(i: int) -> Callable[[], Awaitable[httpx.Response]]:
+        async def create() -> httpx.Response:
+            r = await c.post(
+                f"{api}/items/", json={"title": f"Benchmark {i}"}, headers=user
+            )
+            if r.status_code == 200:
+                ids.append(r.json()["id"])
+            return r
+
+        return create
+
+    def call(
+        method: str, url: str, **kwargs: Any
+    ) -> Callable[[], Awaitable[httpx.Response]]:
+        return lambda: c.request(method, url, headers=user, **kwargs)
+
+    update = {"title": "Updated"}
+    results.append(
+        await run_calls(
+            "POST /items/",
+            [post_item(i) for i in range(requests)],
+            concurrency=concurrency,
+        )
+    )
+    results.append(
+        await run_calls(
+            "GET /items/{id}",
+            [call("GET", f"{api}/items/{id}") for id in ids],
+            concurrency=concurrency,
+        )
+    )
+    results.append(
+        await run_calls(
+            "PUT /items/{id}",
+            [call("PUT", f"{api}/items/{id}", json=update) for id in ids],
+            concurrency=concurrency,
+        )
+    )
+    results.append(
+        await run_calls(
+            "DELETE /items/{id}",
+            [call("DELETE", f"{api}/items/{id}") for id in ids],
+            concurrency=concurrency,
+        )
+    )
+    return results
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    data = await seed_database(args.seed, args.users, args.items_per_user)
+    try:
+        client = (
+            uvicorn_client(args.workers) if args.target == "uvicorn" else asgi_client()
+        )
+        async with client as c:
+            results = await run_scenarios(
+                c,
+                data,
+                requests=args.requests,
+                login_requests=args.login_requests,
+                concurrency=args.concurrency,
+                page_sizes=args.page_sizes,
+            )
+    finally:
+        await clear(data.email_prefix)
+        await async_engine.dispose()
+    for result in results:
+        print(result.summary(), file=sys.stderr)
+    return {
+        "target": args.target,
+        "workers": args.workers if args.target == "uvicorn" else None,
+        "seed": args.seed,
+        "users": args.users,
+        "items": data.items,
+        "concurrency": args.concurrency,
+        "results": [result.to_dict() for result in results],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--items-per-user", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--output", help="Write the JSON here instead of stdout")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Requests per second of the sync Session dependency against the AsyncSession one.
+
+Both endpoints run the same query, optionally padded with `pg_sleep` to mimic a
+slower database. Sync endpoints hold an anyio worker thread for the whole request,
+so keep the concurrency below the thread limit (40) and the pool size (5 + 10
+overflow) or the sync mode stalls waiting for threads to give connections back.
+
+    python -m app.benchmarks.async_db --requests 2000 --concurrency 30
+"""
+
+import argparse
+import asyncio
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.api.deps import AsyncSessionDep, SessionDep
+from app.benchmarks.utils import LoadResult, run_load
+from app.core.db import async_engine
+from app.models import Item
+
+bench_app = FastAPI()
+query_delay = 0.0
+
+
+@bench_app.get("/sync")
+def sync_items(session: SessionDep) -> Any:
+    if query_delay:
+        session.exec(text("SELECT pg_sleep(:delay)").bindparams(delay=query_delay))  # type: ignore
+    return session.exec(select(Item).limit(100)).all()
+
+
+@bench_app.get("/async")
+async def async_items(session: AsyncSessionDep) -> Any:
+    if query_delay:
+        await session.exec(
+            text("SELECT pg_sleep(:delay)").bindparams(delay=query_delay)
+        )  # type: ignore
+    return (await session.exec(select(Item).limit(100))).all()
+
+
+async def run(requests: int, concurrency: int) -> list[LoadResult]:
+    transport = httpx.ASGITransport(app=bench_app)  # type: ignore[arg-type]
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for mode in ("sync", "async"):
+            # Warm up the connection pools before measuring
+            await run_load(c, mode, "GET", f"/{mode}", requests=10, concurrency=10)
+            results.append(
+                await run_load(
+                    c,
+                    mode,
+                    "GET",
+                    f"/{mode}",
+                    requests=requests,
+                    concurrency=concurrency,
+                )
+            )
+    await async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    global query_delay
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--query-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    query_delay = args.query_delay
+    for result in asyncio.run(run(args.requests, args.concurrency)):
+        print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
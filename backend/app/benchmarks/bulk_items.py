@@ -0,0 +1,67 @@
+"""
+Creating N items with N calls to POST /items/ against one call to POST /items/bulk.
+The created items are deleted afterwards.
+
+    python -m app.benchmarks.bulk_items --items 500
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlmodel import col, delete
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.main import app
+from app.models import Item
+
+
+async def run(items: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    base_url = f"http://bench{settings.API_V1_STR}"
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    data = [{"title": f"Benchmark {i}", "description": "bulk"} for i in range(items)]
+    created: list[int] = []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as c:
+        r = await c.post("/login/access-token", data=login_data)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create(item: dict[str, str]) -> None:
+            async with semaphore:
+                r = await c.post("/items/", json=item, headers=headers)
+                created.append(r.json()["id"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(create(item) for item in data))
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        r = await c.post("/items/bulk", json=data, headers=headers)
+        bulk = time.perf_counter() - start
+        created.extend(r.json()["ids"])
+
+    async with async_engine.begin() as connection:
+        await connection.execute(delete(Item).where(col(Item.id).in_(created)))
+    await async_engine.dispose()
+    print(
+        f"{items} x POST /items/   {single * 1000:>9.1f} ms  {items / single:>9.1f} items/s"
+    )
+    print(f"1 x POST /items/bulk  {bulk * 1000:>9.1f} ms  {items / bulk:>9.1f} items/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+CPU time against bytes saved for each compression encoding and level, on list
+pages shaped like the ones the API returns and on the OpenAPI document.
+
+    python -m app.benchmarks.compression --page-size 100 --number 200
+"""
+
+import argparse
+import json
+import timeit
+from collections.abc import Callable
+from functools import partial
+
+from app.core.compression import (
+    BrotliCompressor,
+    Compressor,
+    GzipCompressor,
+    ZstdCompressor,
+    available_encodings,
+)
+from app.main import app
+from app.models import ItemPublic, ItemsPublic, UserPublic, UsersPublic
+
+LEVELS: dict[str, tuple[Callable[[int], Compressor], list[int]]] = {
+    "gzip": (GzipCompressor, [1, 6, 9]),
+    "br": (BrotliCompressor, [1, 4, 6, 11]),
+    "zstd": (ZstdCompressor, [1, 3, 9]),
+}
+
+
+def payloads(page_size: int) -> dict[str, bytes]:
+    items = ItemsPublic(
+        data=[
+            ItemPublic(
+                id=i,
+                owner_id=i % 7 + 1,
+                title=f"Item {i}",
+                description=f"Description of item {i}, with a few more words",
+            )
+            for i in range(page_size)
+        ],
+        count=page_size * 10,
+        next_cursor="eyJpZCI6IDEwMH0=",
+    )
+    users = UsersPublic(
+        data=[
+            UserPublic(
+                id=i,
+                email=f"user{i}@example.com",
+                full_name=f"User Number {i}",
+                is_active=True,
+                is_superuser=False,
+            )
+            for i in range(page_size)
+        ],
+        count=page_size * 10,
+    )
+    return {
+        f"items page ({page_size})": items.model_dump_json().encode(),
+        f"users page ({page_size})": users.model_dump_json().encode(),
+        "openapi.json": json.dumps(app.openapi()).encode(),
+    }
+
+
+def compress(factory: Callable[[int], Compressor], level: int, data: bytes) -> bytes:
+    compressor = factory(level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    encodings = available_encodings(list(LEVELS))
+    for name, data in payloads(args.page_size).items():
+        print(f"{name}: {len(data)} bytes")
+        for encoding in encodings:
+            factory, levels = LEVELS[encoding]
+            for level in levels:
+                run = partial(compress, factory, level, data)
+                size = len(run())
+                seconds = timeit.timeit(run, number=args.number) / args.number
+                print(
+                    f"  {encoding:<5} level {level:<3} {size:>8} bytes "
+                    f"{1 - size / len(data):>7.1%} saved "
+                    f"{seconds * 1_000_000:>9.1f} us "
+                    f"{(len(data) - size) / seconds / 1_000_000:>8.1f} MB saved/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Render time per email: reading and compiling the template file on every call
+against the shared, precompiled template environment.
+
+    python -m app.benchmarks.email_templates --number 2000
+"""
+
+import argparse
+import timeit
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Template
+
+from app.utils import get_email_templates, load_email_templates
+
+TEMPLATES_DIR = Path(__file__).parents[1] / "email-templates" / "build"
+CONTEXT: dict[str, Any] = {
+    "project_name": "Benchmark",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "valid_hours": 48,
+    "link": "https://example.com/reset-password?token=token",
+    "password": "password",
+}
+
+
+def render_from_file(template_name: str) -> str:
+    return Template((TEMPLATES_DIR / template_name).read_text()).render(CONTEXT)
+
+
+def render_precompiled(template_name: str) -> str:
+    return get_email_templates().get_template(template_name).render(CONTEXT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+    load_email_templates()
+    for template_name in get_email_templates().list_templates():
+        for name, render in (
+            ("read + compile", render_from_file),
+            ("precompiled", render_precompiled),
+        ):
+            seconds = timeit.timeit(partial(render, template_name), number=args.number)
+            print(
+                f"{template_name:<22} {name:<16} "
+                f"{seconds / args.number * 1_000_000:>9.1f} us/email"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Overhead of MetricsMiddleware per request: an endpoint doing nothing, called
+through the middleware and without it. No database is needed.
+
+    python -m app.benchmarks.metrics --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from app.core.metrics import MetricsMiddleware, render_metrics
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping", tags=["benchmark"])
+    def ping() -> dict[str, str]:
+        return {"message": "pong"}
+
+    if instrumented:
+        app.add_middleware(
+            MetricsMiddleware,
+            operations={
+                route.endpoint: route.name
+                for route in app.routes
+                if isinstance(route, APIRoute)
+            },
+        )
+    return app
+
+
+async def time_requests(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for _ in range(100):
+            await c.get("/ping")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await c.get("/ping")
+        return (time.perf_counter() - start) / requests
+
+
+async def run(requests: int) -> None:
+    plain = await time_requests(make_app(False), requests)
+    instrumented = await time_requests(make_app(True), requests)
+    print(f"without metrics  {plain * 1_000_000:>8.1f} us/request")
+    print(f"with metrics     {instrumented * 1_000_000:>8.1f} us/request")
+    print(f"overhead         {(instrumented - plain) * 1_000_000:>8.1f} us/request")
+    start = time.perf_counter()
+    content, _ = render_metrics()
+    seconds = time.perf_counter() - start
+    print(f"/metrics render  {seconds * 1000:>8.2f} ms, {len(content)} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Time per call of the crud, security and token/email helpers on the login and
+write paths, compared with a stored baseline. Timings above the baseline by more
+than --threshold are flagged as regressions and make the command exit with 1.
+
+Save a baseline on the machine that runs the comparison, timings from other
+machines aren't comparable:
+
+    python -m app.benchmarks.micro --save
+    python -m app.benchmarks.micro --threshold 0.2
+
+crud benchmarks write users and items to the database, they are deleted
+afterwards.
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import timeit
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlmodel import Session, col, delete, select
+
+from app import crud
+from app.core.db import engine
+from app.core.security import (
+    create_access_token,
+    get_password_hash,
+    password_hasher,
+    verify_password,
+)
+from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.utils import (
+    generate_new_account_email,
+    generate_password_reset_token,
+    generate_reset_password_email,
+    generate_test_email,
+    load_email_templates,
+    verify_password_reset_token,
+)
+
+BASELINE = Path(__file__).parent / "micro_baseline.json"
+EMAIL_PREFIX = "micro-benchmark-"
+PASSWORD = "benchmark-password"
+
+
+def benchmarks(session: Session) -> dict[str, Callable[[], Any]]:
+    """
+    Zero-argument callables to time, by name.
+    """
+    counter = itertools.count()
+    hashed_password = get_password_hash(PASSWORD)
+    user_in = UserCreate(email=f"{EMAIL_PREFIX}main@example.com", password=PASSWORD)
+    user = crud.create_user(session=session, user_create=user_in)
+    assert user.id is not None
+    owner_id = user.id
+    token = generate_password_reset_token(user.email)
+
+    def create_user() -> None:
+        email = f"{EMAIL_PREFIX}{next(counter)}@example.com"
+        crud.create_user(
+            session=session, user_create=UserCreate(email=email, password=PASSWORD)
+        )
+
+    def update_user() -> None:
+        user_in = UserUpdate(full_name=f"User {next(counter)}")
+        crud.update_user(session=session, db_user=user, user_in=user_in)
+
+    def authenticate() -> None:
+        assert crud.authenticate(session=session, email=user.email, password=PASSWORD)
+
+    def create_item() -> None:
+        item_in = ItemCreate(title=f"Item {next(counter)}")
+        crud.create_item(session=session, item_in=item_in, owner_id=owner_id)
+
+    return {
+        "crud.create_user": create_user,
+        "crud.update_user": update_user,
+        "crud.authenticate": authenticate,
+        "crud.create_item": create_item,
+        "security.create_access_token": lambda: create_access_token(
+            owner_id, timedelta(minutes=30)
+        ),
+        "security.get_password_hash": lambda: get_password_hash(PASSWORD),
+        "security.verify_password": lambda: verify_password(PASSWORD, hashed_password),
+        "utils.generate_password_reset_token": lambda: generate_password_reset_token(
+            user.email
+        ),
+        "utils.verify_password_reset_token": lambda: verify_password_reset_token(token),
+        "utils.generate_test_email": lambda: generate_test_email(user.email),
+        "utils.generate_reset_password_email": lambda: generate_reset_password_email(
+            user.email, user.email, token
+        ),
+        "utils.generate_new_account_email": lambda: generate_new_account_email(
+            user.email, user.email, PASSWORD
+        ),
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> float:
+    """
+    Best time per call in seconds over `repeat` runs of at least 0.2s each.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def compare(
+    baseline: dict[str, float], current: dict[str, float], threshold: float
+) -> list[str]:
+    """
+    Print each timing against the baseline, return the names that regressed.
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, seconds in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>12} {seconds * 1e6:>10.1f}us {'new':>8}")
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<40} {before * 1e6:>10.1f}us {seconds * 1e6:>10.1f}us "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def run(names: list[str] | None, repeat: int) -> dict[str, float]:
+    load_email_templates()
+    results: dict[str, float] = {}
+    with Session(engine) as session:
+        try:
+            for name, fn in benchmarks(session).items():
+                if names and not any(name.startswith(n) for n in names):
+                    continue
+                results[name] = time_call(fn, repeat)
+        finally:
+            users = col(User.email).startswith(EMAIL_PREFIX)
+            owners = select(User.id).where(users)
+            session.exec(delete(Item).where(col(Item.owner_id).in_(owners)))  # type: ignore
+            session.exec(delete(User).where(users))  # type: ignore
+            session.commit()
+    password_hasher.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "names", nargs="*", help="Only run benchmarks starting with these, e.g. crud."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Slowdown over the baseline flagged as a regression, 0.2 is 20%%",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="Store the timings as the new baseline"
+    )
+    args = parser.parse_args()
+    current = run(args.names, args.repeat)
+    baseline: dict[str, float] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    if args.save:
+        args.baseline.write_text(json.dumps(baseline | current, indent=2) + "\n")
+        print(f"Saved {len(current)} timings to {args.baseline}")
+        return
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
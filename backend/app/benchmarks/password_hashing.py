@@ -0,0 +1,83 @@
+"""
+GET /items/ latency while a burst of logins hashes passwords, with bcrypt in the
+request process (threadpool) and in the password hashing process pool.
+
+    python -m app.benchmarks.password_hashing --logins 200 --reads 1000
+"""
+
+import argparse
+import asyncio
+
+import httpx
+
+from app.benchmarks.utils import LoadResult, run_load
+from app.core import security
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.security import PasswordHasher
+from app.core.throttle import MemoryThrottleBackend, login_throttle
+from app.main import app
+
+
+async def run_mode(
+    hasher: PasswordHasher, logins: int, reads: int, concurrency: int
+) -> list[LoadResult]:
+    security.password_hasher = hasher
+    # Every login is for the same account from the same client, the throttle
+    # would answer most of them with 429 before any hashing
+    settings.LOGIN_THROTTLE_ENABLED = False
+    # Each mode starts with fresh buckets
+    if isinstance(login_throttle.backend, MemoryThrottleBackend):
+        login_throttle.backend.clear()
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    base_url = f"http://bench{settings.API_V1_STR}"
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    mode = "process pool" if hasher.workers else "threadpool"
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as c:
+        r = await c.post("/login/access-token", data=login_data)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        results = await asyncio.gather(
+            run_load(
+                c,
+                f"login ({mode})",
+                "POST",
+                "/login/access-token",
+                requests=logins,
+                concurrency=concurrency,
+                data=login_data,
+            ),
+            run_load(
+                c,
+                f"GET /items/ ({mode})",
+                "GET",
+                "/items/",
+                requests=reads,
+                concurrency=concurrency,
+                headers=headers,
+            ),
+        )
+    hasher.shutdown()
+    await async_engine.dispose()
+    return list(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+    for workers in (0, args.workers):
+        hasher = PasswordHasher(workers=workers, queue_limit=args.logins)
+        for result in asyncio.run(
+            run_mode(hasher, args.logins, args.reads, args.concurrency)
+        ):
+            print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Serializing 100 row ItemsPublic and UsersPublic pages: FastAPI validating the
+returned model against `response_model` and encoding it with the standard
+library, against FastJSONResponse. Then requests per second of GET /items/ and
+GET /users/ with the rows in the database. Rows created here are deleted
+afterwards.
+
+    python -m app.benchmarks.serialization --rows 100 --requests 1000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlmodel import col, delete, insert
+
+from app.api.responses import FastJSONResponse
+from app.benchmarks.utils import run_load
+from app.core.config import settings
+from app.core.db import async_engine
+from app.main import app
+from app.models import Item, ItemsPublic, User, UsersPublic
+
+
+def response_field(path: str) -> Any:
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path:
+            return route.response_field
+    raise LookupError(path)
+
+
+async def fastapi_render(field: Any, page: Any) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_render(_field: Any, page: Any) -> bytes:
+    return FastJSONResponse(page).body
+
+
+async def compare_rendering(rows: int, number: int) -> None:
+    items = ItemsPublic(
+        data=[
+            Item(id=i, title=f"Item {i}", description="Description", owner_id=1)
+            for i in range(rows)
+        ],
+        count=rows,
+    )
+    users = UsersPublic(
+        data=[
+            User(id=i, email=f"user{i}@example.com", hashed_password="hash")
+            for i in range(rows)
+        ],
+        count=rows,
+    )
+    for path, page in (
+        (f"{settings.API_V1_STR}/items/", items),
+        (f"{settings.API_V1_STR}/users/", users),
+    ):
+        field = response_field(path)
+        for name, render in (
+            ("response_model", fastapi_render),
+            ("FastJSONResponse", fast_render),
+        ):
+            start = time.perf_counter()
+            for _ in range(number):
+                await render(field, page)
+            seconds = time.perf_counter() - start
+            print(f"{path:<20} {name:<18} {seconds / number * 1_000_000:>9.1f} us/page")
+
+
+async def load(rows: int, requests: int, concurrency: int) -> None:
+    # Inserted directly, hashing a password per user would take longer than the run
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            insert(User).values(
+                [
+                    {
+                        "email": f"benchmark-{uuid.uuid4()}@example.com",
+                        "hashed_password": "not a hash",
+                        "is_active": False,
+                    }
+                    for _ in range(rows)
+                ]
+            )
+        )
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    base_url = f"http://bench{settings.API_V1_STR}"
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as c:
+        r = await c.post("/login/access-token", data=login_data)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        created = await c.post(
+            "/items/bulk",
+            json=[{"title": f"Benchmark {i}"} for i in range(rows)],
+            headers=headers,
+        )
+        params = {"limit": rows, "include_count": False}
+        for url in ("/items/", "/users/"):
+            result = await run_load(
+                c,
+                f"GET {url}?limit={rows}",
+                "GET",
+                url,
+                requests=requests,
+                concurrency=concurrency,
+                params=params,
+                headers=headers,
+            )
+            print(result.summary())
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            delete(Item).where(col(Item.id).in_(created.json()["ids"]))
+        )
+        await connection.execute(
+            delete(User).where(col(User.email).startswith("benchmark-"))
+        )
+    await async_engine.dispose()
+
+
+async def run(rows: int, number: int, requests: int, concurrency: int) -> None:
+    await compare_rendering(rows, number)
+    await load(rows, requests, concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.number, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+
+@dataclass
+class LoadResult:
+    name: str
+    requests: int
+    elapsed: float
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Machine readable summary, latencies in milliseconds.
+        """
+        mean = statistics.fmean(self.latencies) if self.latencies else 0.0
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 4),
+            "rps": round(self.rps, 2),
+            "mean_ms": round(mean * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+        }
+
+    def summary(self) -> str:
+        mean = statistics.fmean(self.latencies) if self.latencies else 0.0
+        return (
+            f"{self.name:<32} {self.rps:>9.1f} req/s  "
+            f"mean {mean * 1000:>7.2f} ms  p95 {self.percentile(95) * 1000:>7.2f} ms  "
+            f"errors {self.errors}"
+        )
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    name: str,
+    method: str,
+    url: str,
+    *,
+    requests: int,
+    concurrency: int,
+    **kwargs: Any,
+) -> LoadResult:
+    """
+    Send `requests` requests with at most `concurrency` in flight.
+    """
+
+    def send() -> Awaitable[httpx.Response]:
+        return client.request(method, url, **kwargs)
+
+    return await run_calls(name, [send] * requests, concurrency=concurrency)
+
+
+async def run_calls(
+    name: str,
+    calls: list[Callable[[], Awaitable[httpx.Response]]],
+    *,
+    concurrency: int,
+) -> LoadResult:
+    """
+    Send the request of each of `calls` with at most `concurrency` in flight,
+    e.g. to address a different item in each one.
+    """
+    result = LoadResult(name=name, requests=len(calls), elapsed=0.0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(call: Callable[[], Awaitable[httpx.Response]]) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            result.latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    result.elapsed = time.perf_counter() - start
+    return result
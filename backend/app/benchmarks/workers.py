@@ -0,0 +1,115 @@
+"""
+Memory of the gunicorn workers started with `app/gunicorn_conf.py`, with the app
+preloaded in the master and imported by each worker (PRELOAD_APP=false). RSS,
+PSS and private memory of each worker are read once the workers are ready, then
+again after --requests requests, along with the password hashing processes the
+workers spawn on the first login. PSS adds up to what the workers really use,
+RSS counts the shared pages once per worker. Linux only, it reads /proc.
+
+    python -m app.benchmarks.workers --workers 4 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from app.benchmarks.api import free_port, login
+from app.benchmarks.utils import run_load
+from app.core.config import settings
+from app.core.memory import MIB, children_memory_usage, memory_usage
+
+GUNICORN_CONF = Path(__file__).parents[1] / "gunicorn_conf.py"
+
+
+def worker_pids(master: int) -> list[int]:
+    children = Path(f"/proc/{master}/task/{master}/children").read_text()
+    return sorted(int(pid) for pid in children.split())
+
+
+def report(label: str, pids: list[int]) -> None:
+    print(f"  {label}")
+    pss = 0
+    for pid in pids:
+        usage = memory_usage(pid)
+        children = children_memory_usage(pid)
+        print(f"    worker {pid}: {usage}")
+        if children:
+            print(f"      child processes: {children}")
+        pss += sum(u.pss for u in (usage, children) if u)
+    print(f"    total pss {pss / MIB:.1f} MiB")
+
+
+async def measure(preload: bool, workers: int, requests: int) -> None:
+    port = free_port()
+    env = {
+        **os.environ,
+        "PRELOAD_APP": str(preload).lower(),
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(workers),
+        "LOG_LEVEL": "warning",
+        "ACCESS_LOG": "",
+        "LOGIN_THROTTLE_ENABLED": "false",
+    }
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(GUNICORN_CONF), "app.main:app"],
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=60
+        ) as c:
+            deadline = time.monotonic() + 60
+            while len(worker_pids(master.pid)) < workers or not await ready(c):
+                if master.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                await asyncio.sleep(0.5)
+            print(f"preload={preload}, master {memory_usage(master.pid)}")
+            pids = worker_pids(master.pid)
+            report("ready", pids)
+            headers = await login(
+                c, settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD
+            )
+            for path in ("/items/", "/users/"):
+                result = await run_load(
+                    c,
+                    f"GET {path}",
+                    "GET",
+                    f"{settings.API_V1_STR}{path}",
+                    requests=requests,
+                    concurrency=workers * 4,
+                    headers=headers,
+                )
+                print(f"  {result.summary()}")
+            report(f"after {2 * requests} requests", pids)
+    finally:
+        master.terminate()
+        master.wait(timeout=60)
+
+
+async def ready(c: httpx.AsyncClient) -> bool:
+    try:
+        r = await c.get(f"{settings.API_V1_STR}/openapi.json")
+    except httpx.TransportError:
+        return False
+    return r.status_code == 200
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    for preload in (False, True):
+        await measure(preload, args.workers, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models import User
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache whose entries expire `ttl` seconds after being set.
+
+    Safe to share between the event loop and threadpool workers.
+    """
+
+    def __init__(self, *, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Detached copies of authenticated users, keyed by user id. Per process: other
+# workers see a new email or name once their own entry expires after
+# USER_CACHE_TTL. get_current_user reads is_active, is_superuser and
+# hashed_password again on every hit, so those changes apply right away.
+user_cache: TTLCache[int, User] = TTLCache(
+    max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL
+)
+
+
+def cache_user(user: User) -> None:
+    # Keep a detached copy so concurrent requests never share a session-bound object
+    assert user.id is not None
+    cached = User(**user.model_dump())
+    make_transient_to_detached(cached)
+    user_cache.set(user.id, cached)
+
+
+def invalidate_user(user_id: int | None) -> None:
+    if user_id is not None:
+        user_cache.invalidate(user_id)
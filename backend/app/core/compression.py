@@ -0,0 +1,213 @@
+import importlib
+import importlib.util
+import logging
+import zlib
+from collections.abc import Callable, Sequence
+from typing import Any, Protocol, TypeVar
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+EndpointT = TypeVar("EndpointT", bound=Callable[..., Any])
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+_skipped_endpoints: set[Callable[..., Any]] = set()
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def finish(self) -> bytes:
+        ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int = 6) -> None:
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int = 4) -> None:
+        brotli = importlib.import_module("brotli")
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)  # type: ignore[no-any-return]
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()  # type: ignore[no-any-return]
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = 3) -> None:
+        zstandard = importlib.import_module("zstandard")
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)  # type: ignore[no-any-return]
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()  # type: ignore[no-any-return]
+
+
+COMPRESSORS: dict[str, Callable[[], Compressor]] = {
+    "zstd": ZstdCompressor,
+    "br": BrotliCompressor,
+    "gzip": GzipCompressor,
+}
+# brotli and zstd come from optional packages, gzip is in the standard library
+OPTIONAL_MODULES = {"zstd": "zstandard", "br": "brotli"}
+
+
+def available_encodings(encodings: Sequence[str]) -> list[str]:
+    """
+    The `encodings` whose compression package is installed, in the same order.
+    """
+    available = []
+    for encoding in encodings:
+        module = OPTIONAL_MODULES.get(encoding)
+        if module and importlib.util.find_spec(module) is None:
+            logger.warning(
+                "Install %s to enable %s compression, skipping it", module, encoding
+            )
+            continue
+        available.append(encoding)
+    return available
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """
+    The encoding with the highest `q` in `accept_encoding`, ties go to the one
+    listed first in `encodings`. None means the response is sent as is.
+    """
+    qualities: dict[str, float] = {}
+    for value in accept_encoding.split(","):
+        coding, _, params = value.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        qualities[coding.strip().lower()] = quality
+    default = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def skip_compression(endpoint: EndpointT) -> EndpointT:
+    """
+    Send the responses of a route endpoint uncompressed, e.g. for long-lived
+    streams where compression would buffer the rows clients are waiting for.
+    """
+    _skipped_endpoints.add(endpoint)
+    return endpoint
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the first of `encodings` the client accepts.
+
+    Bodies smaller than `minimum_size`, non-text content and responses that are
+    already encoded are sent as is. Streamed responses are compressed chunk by
+    chunk unless their endpoint is marked with `skip_compression`.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, encodings: Sequence[str], minimum_size: int = 1000
+    ) -> None:
+        self.app = app
+        self.encodings = list(encodings)
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(scope, send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self, scope: Scope, send: Send, encoding: str, minimum_size: int
+    ) -> None:
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Message | None = None
+        self.compressor: Compressor | None = None
+
+    def should_compress(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        # The router stores the matched endpoint in the scope before calling it
+        return self.scope.get("endpoint") not in _skipped_endpoints
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Wait for the first body chunk to know if it's worth compressing
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            if not self.should_compress(headers) or (
+                not more_body and len(body) < self.minimum_size
+            ):
+                await self.downstream(start_message)
+                await self.downstream(message)
+                return
+            self.compressor = COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The compressed bytes differ from the ones the strong ETag names
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.downstream(start_message)
+                await self.downstream({"type": "http.response.body", "body": body})
+                return
+            await self.downstream(start_message)
+        elif self.compressor is None:
+            await self.downstream(message)
+            return
+        body = self.compressor.compress(body)
+        if not more_body:
+            body += self.compressor.finish()
+        await self.downstream(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
@@ -1,10 +1,35 @@
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
-from app import crud
 from app.core.config import settings
+from app.core.pool import pool_options
+from app.core.queries import instrument_engine
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **pool_options())
+# The psycopg dialect picks its async driver when used with create_async_engine
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **pool_options(asynchronous=True)
+)
+replica_engines = [
+    create_async_engine(url, **pool_options(asynchronous=True))
+    for url in settings.DATABASE_REPLICA_URLS
+]
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"replica-{index}")
+
+
+def reset_engines_after_fork() -> None:
+    """
+    Forget the pooled connections inherited from the parent process, without
+    closing them, the parent still owns them. Call it in each forked worker.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica_engine in replica_engines:
+        replica_engine.sync_engine.dispose(close=False)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -13,6 +38,10 @@ engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
 
 def init_db(session: Session) -> None:
+    # Imported here, crud pulls in FastAPI through the security helpers, which
+    # the prestart scripts importing the engines don't need
+    from app import crud
+
     # Tables should be created with Alembic migrations
     # But if you don't want to use migrations, create
     # the tables un-commenting the next lines
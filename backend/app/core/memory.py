@@ -0,0 +1,76 @@
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+MIB = 1024 * 1024
+
+
+@dataclass
+class MemoryUsage:
+    """
+    Memory of a process in bytes. `pss` splits each shared page between the
+    processes sharing it, `private` is what exiting the process would free.
+    """
+
+    rss: int
+    pss: int
+    shared: int
+    private: int
+
+    def __str__(self) -> str:
+        return (
+            f"rss {self.rss / MIB:.1f} MiB, pss {self.pss / MIB:.1f} MiB, "
+            f"shared {self.shared / MIB:.1f} MiB, private {self.private / MIB:.1f} MiB"
+        )
+
+
+def memory_usage(pid: int | str = "self") -> MemoryUsage | None:
+    """
+    Read from `/proc/<pid>/smaps_rollup`, None when it is missing (not Linux, or
+    the process is gone).
+    """
+    try:
+        text = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    fields: dict[str, int] = {}
+    for line in text.splitlines()[1:]:
+        name, _, value = line.partition(":")
+        fields[name] = int(value.split()[0]) * 1024
+    return MemoryUsage(
+        rss=fields.get("Rss", 0),
+        pss=fields.get("Pss", 0),
+        shared=fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        private=fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    )
+
+
+def child_pids(pid: int | str = "self") -> list[int]:
+    """
+    Processes started by any thread of the process, and their own children.
+    """
+    pids = []
+    for children in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            text = children.read_text()
+        except OSError:
+            continue
+        for child in text.split():
+            pids.append(int(child))
+            pids.extend(child_pids(child))
+    return sorted(pids)
+
+
+def children_memory_usage(pid: int | str = "self") -> MemoryUsage | None:
+    """
+    Memory of the child processes added up, e.g. the password hashing pool of a
+    worker. None when the process has no children.
+    """
+    usages = [usage for child in child_pids(pid) if (usage := memory_usage(child))]
+    if not usages:
+        return None
+    return MemoryUsage(
+        **{
+            field.name: sum(getattr(usage, field.name) for usage in usages)
+            for field in fields(MemoryUsage)
+        }
+    )
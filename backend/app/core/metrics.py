@@ -0,0 +1,118 @@
+import os
+import time
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client import REGISTRY as DEFAULT_REGISTRY
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Label values are taken from these fixed sets so the number of series stays
+# bounded whatever clients send
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+UNMATCHED = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to send the response of a request, by operation id",
+    ["operation", "method", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time to execute a SQL statement, by engine and statement type",
+    ["engine", "statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time to hash or verify a password, including the wait for a hashing process",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2.5, 5, 10),
+)
+EMAIL_SEND_DURATION = Histogram(
+    "email_send_duration_seconds",
+    "Time of one attempt to send an email through SMTP",
+    ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+EMAILS_SENT = Counter("emails_sent", "Email send attempts", ["outcome"])
+
+
+def status_class(status: int) -> str:
+    return f"{status // 100}xx"
+
+
+def statement_type(statement: str) -> str:
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in STATEMENTS else "OTHER"
+
+
+class MetricsMiddleware:
+    """
+    Record the duration of each request labeled with the operation id of the
+    route that served it, see `custom_generate_unique_id`.
+
+    Requests that matched no route share the `unmatched` operation, unknown
+    methods are counted as `OTHER` and statuses by class, e.g. `2xx`.
+    """
+
+    def __init__(self, app: ASGIApp, *, operations: dict[Any, str]) -> None:
+        self.app = app
+        # Route endpoints to their operation id
+        self.operations = operations
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            # The router stores the matched endpoint in the scope before calling it
+            operation = self.operations.get(scope.get("endpoint"), UNMATCHED)
+            REQUEST_DURATION.labels(operation, method, status_class(status)).observe(
+                duration
+            )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    The metrics in the Prometheus text format, and its content type.
+
+    With several server workers set PROMETHEUS_MULTIPROC_DIR to a directory
+    shared by them, the metrics of every worker are then added up.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    else:
+        registry = DEFAULT_REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
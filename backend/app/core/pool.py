@@ -0,0 +1,100 @@
+import bisect
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+from app.core.config import settings
+from app.models import PoolStats, PoolWaitBucket
+
+# Upper bounds in seconds of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class WaitHistogram:
+    """
+    Time spent waiting for a pooled connection, counted in `WAIT_BUCKETS`.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(WAIT_BUCKETS)
+        self.total = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.total += seconds
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+class TimedQueuePoolMixin:
+    """
+    Records how long each checkout waited for a connection in `wait_histogram`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc,no-any-return]
+        except exc.TimeoutError:
+            self.wait_histogram.timed_out()
+            raise
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedQueuePoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(*, asynchronous: bool = False) -> dict[str, Any]:
+    """
+    Engine keyword arguments for a connection pool configured from the settings.
+    """
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if asynchronous else TimedQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+
+
+def pool_stats(name: str, engine: Engine | AsyncEngine) -> PoolStats:
+    pool = engine.pool
+    assert isinstance(pool, TimedQueuePoolMixin) and isinstance(pool, QueuePool)
+    histogram = pool.wait_histogram
+    return PoolStats(
+        name=name,
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        max_overflow=pool._max_overflow,
+        timeout=pool.timeout(),
+        waits=sum(histogram.counts),
+        wait_seconds_total=histogram.total,
+        timeouts=histogram.timeouts,
+        wait_histogram=[
+            PoolWaitBucket(le=None if le == float("inf") else le, count=count)
+            for le, count in zip(WAIT_BUCKETS, histogram.counts, strict=True)
+        ],
+    )
@@ -0,0 +1,157 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import DB_QUERY_DURATION, statement_type
+from app.core.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """
+    Statements executed while serving one request, or inside `track_queries`.
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+    scope: Scope | None = None
+
+    @property
+    def route(self) -> str | None:
+        return route_name(self.scope) if self.scope else None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.3f};desc="{self.count} queries"'
+
+
+def route_name(scope: Scope) -> str:
+    """
+    `METHOD endpoint` once the router matched the request, `METHOD /path` before.
+    """
+    endpoint = scope.get("endpoint")
+    return f"{scope['method']} {getattr(endpoint, '__name__', scope['path'])}"
+
+
+# Set for the duration of a request, copied into the threadpool and into the
+# greenlets running async engine statements
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(scope: Scope | None = None) -> Iterator[QueryStats]:
+    stats = QueryStats(scope=scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Time the statements of `engine`, the `sync_engine` of an async one, for the
+    metrics and the statistics of the current request.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Any, _cursor: Any, _statement: str, *_args: Any
+    ) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Any, _cursor: Any, statement: str, parameters: Any, *_args: Any
+    ) -> None:
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        DB_QUERY_DURATION.labels(name, statement_type(statement)).observe(duration)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+        if slow_query_log.enabled:
+            route = stats.route if stats is not None else None
+            slow_query_log.record(statement, parameters, duration, route)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context: Any) -> None:
+        # Failed statements never reach after_cursor_execute. Errors raised
+        # here would replace the database error, so nothing is assumed
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start_time")
+            if starts:
+                starts.pop()
+
+
+class QueryCounterMiddleware:
+    """
+    Count the statements each request executes and their total time.
+
+    With `server_timing` they are sent in a `Server-Timing` header, e.g.
+    `db;dur=3.052;desc="4 queries"`. A warning is logged when a request runs
+    more than `budget` statements, or the same statement `repeat_threshold`
+    times or more, usually a query in a loop (N+1). 0 disables either check.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        budget: int,
+        repeat_threshold: int,
+        server_timing: bool = True,
+    ) -> None:
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope) as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if self.server_timing and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self.check(scope, stats)
+
+    def check(self, scope: Scope, stats: QueryStats) -> None:
+        route = route_name(scope)
+        if self.budget and stats.count > self.budget:
+            logger.warning(
+                f"{route} ran {stats.count} queries, over the budget of {self.budget}"
+            )
+        if self.repeat_threshold:
+            for statement, count in stats.statements.most_common():
+                if count < self.repeat_threshold:
+                    break
+                logger.warning(
+                    f"{route} ran the same query {count} times, "
+                    f"possible N+1: {statement}"
+                )
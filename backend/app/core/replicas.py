@@ -0,0 +1,92 @@
+import itertools
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Literal
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import async_engine, replica_engines
+
+# Set on responses to writes, reads carrying it go to the primary
+PRIMARY_COOKIE = "read_primary"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine of read-only sessions among the replicas.
+
+    Round robin takes them in turn, least connections takes the one serving
+    the fewest sessions right now. Without replicas everything reads from the
+    primary. Counts are per process and only touched from the event loop.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        *,
+        strategy: Literal["round_robin", "least_connections"] = "round_robin",
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.in_use = [0] * len(replicas)
+        self._turns = itertools.count()
+
+    def _choose(self) -> int:
+        if self.strategy == "least_connections":
+            return min(range(len(self.replicas)), key=self.in_use.__getitem__)
+        return next(self._turns) % len(self.replicas)
+
+    @contextmanager
+    def engine(self, *, primary: bool = False) -> Iterator[AsyncEngine]:
+        if primary or not self.replicas:
+            yield self.primary
+            return
+        index = self._choose()
+        self.in_use[index] += 1
+        try:
+            yield self.replicas[index]
+        finally:
+            self.in_use[index] -= 1
+
+
+read_router = ReplicaRouter(
+    async_engine, replica_engines, strategy=settings.DATABASE_REPLICA_STRATEGY
+)
+
+
+class StickyPrimaryMiddleware:
+    """
+    Sends clients back to the primary for `seconds` after a successful write.
+
+    Replicas lag behind the primary, so a client reading right after it wrote
+    could miss its own change. Clients that keep cookies get `PRIMARY_COOKIE`
+    and their reads skip the replicas until it expires.
+    """
+
+    def __init__(self, app: ASGIApp, *, seconds: int) -> None:
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_COOKIE}=1; Max-Age={self.seconds}; Path=/; "
+                    "HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
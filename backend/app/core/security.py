@@ -1,16 +1,131 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from functools import cache
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import jwt
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_DURATION
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@cache
+def get_pwd_context() -> "CryptContext":
+    # passlib and bcrypt are imported on first use, not by every process that
+    # imports the app, e.g. the prestart scripts
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+    )
 
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+
+class PasswordHashingBusy(Exception):
+    """
+    More password operations are waiting than the queue limit allows.
+    """
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of `workers` processes so it never holds the GIL of the
+    process serving requests. At most `queue_limit` operations wait for a free
+    worker, after that PasswordHashingBusy is raised. With 0 workers bcrypt runs
+    inline (or in the threadpool for the async methods).
+    """
+
+    def __init__(self, *, workers: int, queue_limit: int) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Started on first use, so each forked server worker gets its own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with PASSWORD_HASH_DURATION.labels(fn.__name__.lstrip("_")).time():
+            if not self.workers:
+                return fn(*args)
+            return self._submit(fn, *args).result()
+
+    async def _async_run(self, fn: Callable[..., T], *args: Any) -> T:
+        start = time.perf_counter()
+        try:
+            if not self.workers:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.wrap_future(self._submit(fn, *args))
+        finally:
+            duration = time.perf_counter() - start
+            PASSWORD_HASH_DURATION.labels(fn.__name__.lstrip("_")).observe(duration)
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    async def async_hash(self, password: str) -> str:
+        return await self._async_run(_hash, password)
+
+    async def async_verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._async_run(_verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.utcnow() + expires_delta
@@ -20,8 +135,16 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+async def async_verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.async_verify(plain_password, hashed_password)
+
+
+async def async_get_password_hash(password: str) -> str:
+    return await password_hasher.async_hash(password)
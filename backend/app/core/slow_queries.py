@@ -0,0 +1,134 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARAMETERS_MAX_LENGTH = 500
+
+_NORMALIZE = [
+    # String literals, then numbers not part of a name
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b"), "?"),
+    # psycopg %(name)s and %s, and :name bind parameters but not ::casts
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"(?<!:):\w+"), "?"),
+    # IN lists and multi-row VALUES of any length
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(statement: str) -> str:
+    """
+    `statement` with its literal values and bind parameters replaced by `?`, so
+    the runs of the same query with different values share one fingerprint.
+    """
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    parameters: str | None
+    route: str | None
+    duration: float
+    timestamp: float
+
+
+@dataclass
+class SlowQueryFingerprint:
+    fingerprint: str
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last_route: str | None = None
+
+
+class SlowQueryLog:
+    """
+    Statements that took at least `threshold` seconds, None disables it.
+
+    Each one is logged and kept in `recent`, the last `max_recent` of them.
+    Their fingerprints add up in a table of `max_fingerprints` entries, when
+    full the one with the least total time makes room for a new one.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float | None,
+        max_fingerprints: int = 1000,
+        max_recent: int = 100,
+        log_parameters: bool = True,
+    ) -> None:
+        self.threshold = threshold
+        self.max_fingerprints = max_fingerprints
+        self.log_parameters = log_parameters
+        self.recent: deque[SlowQuery] = deque(maxlen=max_recent)
+        self.fingerprints: dict[str, SlowQueryFingerprint] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold is not None
+
+    def record(
+        self, statement: str, parameters: Any, duration: float, route: str | None
+    ) -> None:
+        if self.threshold is None or duration < self.threshold:
+            return
+        shown = None
+        if self.log_parameters and parameters:
+            shown = repr(parameters)[:PARAMETERS_MAX_LENGTH]
+        logger.warning(
+            f"slow query {duration * 1000:.1f} ms in {route or 'no route'}: "
+            f"{statement} {shown or ''}".rstrip()
+        )
+        key = fingerprint(statement)
+        with self._lock:
+            self.recent.append(
+                SlowQuery(statement, shown, route, duration, time.time())
+            )
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                if len(self.fingerprints) >= self.max_fingerprints:
+                    smallest = min(self.fingerprints.values(), key=lambda e: e.total)
+                    del self.fingerprints[smallest.fingerprint]
+                entry = self.fingerprints[key] = SlowQueryFingerprint(key)
+            entry.calls += 1
+            entry.total += duration
+            entry.max = max(entry.max, duration)
+            entry.last_route = route
+
+    def top(self, n: int) -> list[SlowQueryFingerprint]:
+        with self._lock:
+            entries = sorted(
+                self.fingerprints.values(), key=lambda e: e.total, reverse=True
+            )
+        return entries[:n]
+
+    def latest(self) -> list[SlowQuery]:
+        with self._lock:
+            return list(reversed(self.recent))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.recent.clear()
+            self.fingerprints.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_THRESHOLD,
+    max_fingerprints=settings.SLOW_QUERY_MAX_FINGERPRINTS,
+    log_parameters=settings.SLOW_QUERY_LOG_PARAMETERS,
+)
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models import ThrottleBucket
+
+
+class ThrottleBackend(Protocol):
+    async def take(self, key: str, *, capacity: int, rate: float) -> float:
+        """
+        Take a token from the bucket `key`, holding at most `capacity` tokens and
+        refilled with `rate` tokens per second.
+
+        Return 0 when a token was taken, otherwise the seconds until one is available.
+        """
+        ...
+
+
+def take_token(
+    *, tokens: float, elapsed: float, capacity: int, rate: float
+) -> tuple[float, float]:
+    """
+    Refill a bucket for `elapsed` seconds and take a token from it.
+
+    Return the tokens left and the seconds to wait, 0 when the token was taken.
+    """
+    tokens = min(capacity, tokens + max(elapsed, 0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryThrottleBackend:
+    """
+    Token buckets of this process, the least recently used are dropped past `max_keys`.
+    """
+
+    def __init__(self, *, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, *, capacity: int, rate: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens, wait = take_token(
+                tokens=tokens, elapsed=now - updated_at, capacity=capacity, rate=rate
+            )
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class DatabaseThrottleBackend:
+    """
+    Token buckets in the `throttlebucket` table, shared by every worker and server.
+
+    A bucket untouched for `max_idle` seconds is full again, no different from a
+    missing one, so those rows are deleted, at most every `cleanup_interval`
+    seconds in each process. Otherwise every username ever tried keeps a row.
+    """
+
+    def __init__(
+        self, engine: AsyncEngine, *, max_idle: float, cleanup_interval: float = 60
+    ) -> None:
+        self.engine = engine
+        self.max_idle = max_idle
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+
+    async def take(self, key: str, *, capacity: int, rate: float) -> float:
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            await self.delete_idle(now)
+        async with AsyncSession(self.engine) as session:
+            # Creates the bucket or locks it, in one statement so a concurrent
+            # cleanup can't delete it in between. Concurrent attempts on the
+            # same key are serialized by the row lock
+            upsert = insert(ThrottleBucket).values(
+                key=key, tokens=capacity, updated_at=now
+            )
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[col(ThrottleBucket.key)],
+                set_={"key": upsert.excluded.key},
+            )
+            await session.exec(upsert)  # type: ignore
+            statement = (
+                select(ThrottleBucket)
+                .where(ThrottleBucket.key == key)
+                .with_for_update()
+            )
+            bucket = (await session.exec(statement)).one()
+            bucket.tokens, wait = take_token(
+                tokens=bucket.tokens,
+                elapsed=now - bucket.updated_at,
+                capacity=capacity,
+                rate=rate,
+            )
+            bucket.updated_at = now
+            session.add(bucket)
+            await session.commit()
+        return wait
+
+    async def delete_idle(self, now: float) -> None:
+        async with AsyncSession(self.engine) as session:
+            statement = delete(ThrottleBucket).where(
+                col(ThrottleBucket.updated_at) < now - self.max_idle
+            )
+            await session.exec(statement)  # type: ignore
+            await session.commit()
+
+
+class LoginThrottle:
+    """
+    Per client IP and per account token buckets in front of password checks.
+    """
+
+    def __init__(self, backend: ThrottleBackend) -> None:
+        self.backend = backend
+
+    async def check(self, *, ip: str, account: str) -> float:
+        """
+        Return 0 when the attempt may go on, otherwise the seconds to wait.
+        """
+        wait = await self.backend.take(
+            f"login:ip:{ip}",
+            capacity=settings.LOGIN_THROTTLE_IP_CAPACITY,
+            rate=settings.LOGIN_THROTTLE_IP_PER_MINUTE / 60,
+        )
+        if wait:
+            return wait
+        return await self.backend.take(
+            f"login:account:{account.lower()}",
+            capacity=settings.LOGIN_THROTTLE_ACCOUNT_CAPACITY,
+            rate=settings.LOGIN_THROTTLE_ACCOUNT_PER_MINUTE / 60,
+        )
+
+
+def get_throttle_backend() -> ThrottleBackend:
+    if settings.LOGIN_THROTTLE_BACKEND == "database":
+        # Minutes for the slowest bucket to refill from empty
+        max_idle = max(
+            settings.LOGIN_THROTTLE_IP_CAPACITY / settings.LOGIN_THROTTLE_IP_PER_MINUTE,
+            settings.LOGIN_THROTTLE_ACCOUNT_CAPACITY
+            / settings.LOGIN_THROTTLE_ACCOUNT_PER_MINUTE,
+        )
+        return DatabaseThrottleBackend(async_engine, max_idle=max_idle * 60)
+    return MemoryThrottleBackend()
+
+
+login_throttle = LoginThrottle(get_throttle_backend())
@@ -1,9 +1,26 @@
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import insert, literal_column, or_
+from sqlmodel import Session, col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.core.cache import invalidate_user
+from app.core.security import (
+    async_get_password_hash,
+    async_verify_password,
+    get_password_hash,
+    verify_password,
+)
+from app.models import (
+    SEARCH_CONFIG,
+    Item,
+    ItemCreate,
+    User,
+    UserCreate,
+    UserUpdate,
+    item_search_vector,
+)
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -27,6 +44,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    invalidate_user(db_user.id)
     return db_user
 
 
@@ -51,3 +69,126 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: int) -> Item
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+async def async_create_user(*, session: AsyncSession, user_create: UserCreate) -> User:
+    hashed_password = await async_get_password_hash(user_create.password)
+    db_obj = User.model_validate(
+        user_create, update={"hashed_password": hashed_password}
+    )
+    session.add(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+async def async_update_user(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate
+) -> Any:
+    user_data = user_in.model_dump(exclude_unset=True)
+    extra_data = {}
+    if "password" in user_data:
+        password = user_data["password"]
+        hashed_password = await async_get_password_hash(password)
+        extra_data["hashed_password"] = hashed_password
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    invalidate_user(db_user.id)
+    return db_user
+
+
+async def async_get_user_by_email(*, session: AsyncSession, email: str) -> User | None:
+    statement = select(User).where(User.email == email)
+    session_user = (await session.exec(statement)).first()
+    return session_user
+
+
+async def async_authenticate(
+    *, session: AsyncSession, email: str, password: str
+) -> User | None:
+    db_user = await async_get_user_by_email(session=session, email=email)
+    if not db_user:
+        return None
+    if not await async_verify_password(password, db_user.hashed_password):
+        return None
+    return db_user
+
+
+async def async_create_item(
+    *, session: AsyncSession, item_in: ItemCreate, owner_id: int
+) -> Item:
+    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
+    session.add(db_item)
+    await session.commit()
+    await session.refresh(db_item)
+    return db_item
+
+
+async def async_create_items(
+    *, session: AsyncSession, items_in: list[ItemCreate], owner_id: int
+) -> list[int]:
+    """
+    Insert all items with one multi-row INSERT in a single transaction.
+    """
+    if not items_in:
+        return []
+    rows = [item_in.model_dump() | {"owner_id": owner_id} for item_in in items_in]
+    statement = insert(Item).values(rows).returning(col(Item.id))
+    ids = (await session.exec(statement)).scalars().all()  # type: ignore
+    await session.commit()
+    return list(ids)
+
+
+async def async_count_rows(
+    *, session: AsyncSession, statement: SelectOfScalar[Any], estimate: bool = False
+) -> tuple[int, bool]:
+    """
+    Count the rows `statement` returns, along with whether the count is exact.
+
+    The estimate is the PostgreSQL planner row estimate (from `pg_class.reltuples`
+    and the column statistics), it scans nothing but is only as fresh as the last
+    ANALYZE. Other databases always get an exact count.
+    """
+    dialect = session.get_bind().dialect
+    if estimate and dialect.name == "postgresql":
+        # Values stay bound parameters, never inlined into the SQL text
+        query = statement.compile(
+            dialect=dialect, compile_kwargs={"render_postcompile": True}
+        )
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {query}", query.params
+        )
+        plan = result.scalar_one()
+        return max(int(plan[0]["Plan"]["Plan Rows"]), 0), False
+    count_statement = select(func.count()).select_from(statement.subquery())
+    return (await session.exec(count_statement)).one(), True
+
+
+def search_items(
+    *, statement: SelectOfScalar[Item], query: str, dialect: str
+) -> SelectOfScalar[Item]:
+    """
+    Narrow `statement` to the items matching `query`, best matches first.
+
+    On PostgreSQL `query` is parsed by `websearch_to_tsquery`, so it can have
+    "quoted phrases", `or` and `-excluded` words, and matches are ranked with
+    `ts_rank` using the `ix_item_search` GIN index. Other databases, e.g. SQLite
+    in tests, get items with every word in the title or description, by id.
+    """
+    if dialect == "postgresql":
+        vector = item_search_vector()
+        tsquery = func.websearch_to_tsquery(literal_column(SEARCH_CONFIG), query)
+        return statement.where(vector.op("@@")(tsquery)).order_by(
+            func.ts_rank(vector, tsquery).desc(), col(Item.id)
+        )
+    for word in query.split():
+        statement = statement.where(
+            or_(
+                col(Item.title).icontains(word, autoescape=True),
+                col(Item.description).icontains(word, autoescape=True),
+            )
+        )
+    return statement.order_by(col(Item.id))
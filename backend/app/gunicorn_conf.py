@@ -0,0 +1,110 @@
+"""
+Gunicorn configuration of the Docker image, its start script uses
+`/app/app/gunicorn_conf.py` when it exists. It reads the same environment
+variables as the default configuration of the base image.
+
+The app is imported once in the master and the workers are forked from it, so
+they share the memory pages of the imported code until one of them writes to
+them. To keep the pages shared:
+
+* The garbage collector is disabled in the master and its objects are frozen
+  right before each fork, so collections in the workers never write to them.
+* Each worker drops the database connections it inherits from the master, they
+  would otherwise be shared by several processes.
+* The modules the app imports on first use (Jinja, passlib and bcrypt, emails)
+  and the email templates are loaded in the master as well, before the first
+  fork.
+
+The memory of each worker is logged when it is forked, once it is ready, and
+when it exits. It leaves out the password hashing processes a worker spawns on
+first use (PASSWORD_HASH_WORKERS), they are started after the worker is ready
+and stopped before it exits, `python -m app.benchmarks.workers` reports them.
+Set `PRELOAD_APP=false` to import the app in each worker instead.
+"""
+
+import gc
+import multiprocessing
+import os
+from typing import Any
+
+from app.core.memory import memory_usage
+
+workers_per_core = float(os.getenv("WORKERS_PER_CORE", "1"))
+max_workers = int(os.getenv("MAX_WORKERS", "0"))
+web_concurrency = int(os.getenv("WEB_CONCURRENCY", "0")) or max(
+    int(workers_per_core * multiprocessing.cpu_count()), 2
+)
+if max_workers:
+    web_concurrency = min(web_concurrency, max_workers)
+
+host = os.getenv("HOST", "0.0.0.0")
+port = os.getenv("PORT", "80")
+
+bind = os.getenv("BIND") or f"{host}:{port}"
+workers = web_concurrency
+worker_class = "uvicorn.workers.UvicornWorker"
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = os.getenv("ERROR_LOG", "-") or None
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+timeout = int(os.getenv("TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+# The backend is only reachable through Traefik, trust the client address it
+# sends in X-Forwarded-For, or every client shares the Traefik address, e.g. in
+# the login throttle
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
+preload_app = os.getenv("PRELOAD_APP", "true").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Collections free objects all over the heap, leaving holes that later
+    # allocations fill, writing to pages that would otherwise stay shared
+    gc.disable()
+
+
+def on_starting(_server: Any) -> None:
+    if preload_app:
+        # Imported on first use by the app, so the workers would each load
+        # their own copy after the fork
+        import emails  # type: ignore  # noqa: F401
+
+        from app.core.security import get_pwd_context
+        from app.utils import load_email_templates
+
+        load_email_templates()
+        get_pwd_context().handler().get_backend()
+
+
+def when_ready(server: Any) -> None:
+    server.log.info(f"Master {os.getpid()} ready, {memory_usage()}")
+
+
+def pre_fork(_server: Any, _worker: Any) -> None:
+    if preload_app:
+        # Moved out of the collected generations, collections in the workers
+        # won't write to their headers
+        gc.freeze()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    if preload_app:
+        from app.core.db import reset_engines_after_fork
+
+        reset_engines_after_fork()
+        gc.enable()
+    server.log.info(f"Worker {worker.pid} forked, {memory_usage()}")
+
+
+def post_worker_init(worker: Any) -> None:
+    worker.log.info(f"Worker {worker.pid} ready, {memory_usage()}")
+
+
+def worker_exit(server: Any, worker: Any) -> None:
+    server.log.info(f"Worker {worker.pid} exiting, {memory_usage()}")
+
+
+def child_exit(_server: Any, worker: Any) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        # Drop the live gauges of the worker, e.g. the requests in progress
+        multiprocess.mark_process_dead(worker.pid)  # type: ignore[no-untyped-call]
@@ -1,10 +1,23 @@
-import sentry_sdk
-from fastapi import FastAPI
+import secrets
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware, available_encodings
 from app.core.config import settings
+from app.core.db import async_engine, replica_engines
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.queries import QueryCounterMiddleware
+from app.core.replicas import StickyPrimaryMiddleware
+from app.core.security import PasswordHashingBusy, password_hasher
+from app.utils import EmailQueueFull, email_dispatcher, load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -12,12 +25,30 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    import sentry_sdk
+
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+    load_email_templates()
+    email_dispatcher.start()
+    yield
+    await run_in_threadpool(email_dispatcher.stop)
+    # Pooled async connections are bound to the event loop that opened them
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -32,4 +63,70 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+if settings.COMPRESSION_ENABLED and settings.COMPRESSION_ENCODINGS:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=available_encodings(settings.COMPRESSION_ENCODINGS),
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    )
+
+if replica_engines and settings.DATABASE_REPLICA_STICKY_SECONDS:
+    app.add_middleware(
+        StickyPrimaryMiddleware, seconds=settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+
+app.add_middleware(
+    QueryCounterMiddleware,
+    budget=settings.QUERY_BUDGET,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+    server_timing=settings.QUERY_SERVER_TIMING,
+)
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(
+    _request: Request, _exc: PasswordHashingBusy
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password operations in progress"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(EmailQueueFull)
+async def email_queue_full_handler(
+    _request: Request, _exc: EmailQueueFull
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many emails waiting to be sent"},
+        headers={"Retry-After": "5"},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+@app.get("/metrics", tags=["metrics"], include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)) -> Response:
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    content, media_type = render_metrics()
+    return Response(content, media_type=media_type)
+
+
+if settings.METRICS_ENABLED:
+    # Added last, so the measured time includes the other middlewares
+    app.add_middleware(
+        MetricsMiddleware,
+        operations={
+            route.endpoint: route.unique_id
+            for route in app.routes
+            if isinstance(route, APIRoute)
+        },
+    )
@@ -1,5 +1,9 @@
+from typing import Any
+
 from pydantic import EmailStr
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import ColumnElement, Index, func, literal_column
+from sqlalchemy.orm import declared_attr
+from sqlmodel import Field, Relationship, SQLModel, col
 
 
 # Shared properties
@@ -51,7 +55,9 @@ class UserPublic(UserBase):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    count_exact: bool = True
+    next_cursor: str | None = None
 
 
 # Shared properties
@@ -76,6 +82,47 @@ class Item(ItemBase, table=True):
     title: str = Field(max_length=255)
     owner_id: int | None = Field(default=None, foreign_key="user.id", nullable=False)
     owner: User | None = Relationship(back_populates="items")
+    # Incremented by the ORM on every update, used for ETags and optimistic locking
+    version: int = Field(default=1)
+
+    # For the listings of one owner and the sorts of read_items, ending with the
+    # id so the pagination cursor can seek to the next page
+    __table_args__ = (
+        Index("ix_item_owner_id_id", "owner_id", "id"),
+        Index("ix_item_owner_id_title_id", "owner_id", "title", "id"),
+        Index("ix_item_title_id", "title", "id"),
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls) -> dict[str, Any]:
+        return {"version_id_col": cls.__table__.c.version}  # type: ignore[attr-defined]
+
+
+# Text search configuration and weights are inlined rather than bound, Postgres
+# only uses an expression index for queries repeating the expression exactly
+SEARCH_CONFIG = "'english'::regconfig"
+
+
+def item_search_vector() -> ColumnElement[Any]:
+    """
+    Full-text search document of an item, title words rank above description ones.
+    """
+    config: ColumnElement[Any] = literal_column(SEARCH_CONFIG)
+    title = func.setweight(
+        func.to_tsvector(config, col(Item.title)), literal_column("'A'")
+    )
+    description = func.setweight(
+        func.to_tsvector(
+            config, func.coalesce(col(Item.description), literal_column("''"))
+        ),
+        literal_column("'B'"),
+    )
+    return title.op("||")(description)
+
+
+Index("ix_item_search", item_search_vector(), postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
 
 
 # Properties to return via API, id is always required
@@ -84,9 +131,15 @@ class ItemPublic(ItemBase):
     owner_id: int
 
 
+class ItemsCreated(SQLModel):
+    ids: list[int]
+
+
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
-    count: int
+    count: int | None
+    count_exact: bool = True
+    next_cursor: str | None = None
 
 
 # Generic message
@@ -105,6 +158,87 @@ class TokenPayload(SQLModel):
     sub: int | None = None
 
 
+# Status of an email sent in the background
+class EmailDeliveryPublic(SQLModel):
+    id: str
+    email_to: str
+    subject: str
+    status: str
+    attempts: int
+    error: str | None
+
+
+# Contents of an opaque keyset pagination cursor
+class Cursor(SQLModel):
+    id: int
+    # Only set for listings sorted by title
+    title: str | None = None
+
+
 class NewPassword(SQLModel):
     token: str
     new_password: str = Field(min_length=8, max_length=40)
+
+
+# Counters of an in-process cache
+class CacheStats(SQLModel):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class PoolWaitBucket(SQLModel):
+    # Upper bound in seconds, None for the waits longer than every bound
+    le: float | None
+    count: int
+
+
+# Connections of a database engine pool in this worker process
+class PoolStats(SQLModel):
+    name: str
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    timeout: float
+    waits: int
+    wait_seconds_total: float
+    timeouts: int
+    wait_histogram: list[PoolWaitBucket]
+
+
+class PoolsStats(SQLModel):
+    pid: int
+    pools: list[PoolStats]
+
+
+class SlowQueryPublic(SQLModel):
+    statement: str
+    parameters: str | None
+    route: str | None
+    duration: float
+    timestamp: float
+
+
+# Slow statements sharing a fingerprint, times in seconds
+class SlowQueryFingerprintPublic(SQLModel):
+    fingerprint: str
+    calls: int
+    total: float
+    max: float
+    last_route: str | None
+
+
+class SlowQueries(SQLModel):
+    threshold: float | None
+    fingerprints: list[SlowQueryFingerprintPublic]
+    recent: list[SlowQueryPublic]
+
+
+# Database model of the shared login throttle token buckets
+class ThrottleBucket(SQLModel, table=True):
+    key: str = Field(primary_key=True, max_length=255)
+    tokens: float
+    updated_at: float
@@ -0,0 +1,16 @@
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session
+
+from app.core.db import engine
+
+
+@pytest.fixture
+def db() -> Generator[Session, None, None]:
+    """
+    Session committing for real: the app reads with its own connections, so it
+    only sees committed rows. They stay in the schema of this test worker.
+    """
+    with Session(engine) as session:
+        yield session
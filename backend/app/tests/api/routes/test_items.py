@@ -1,8 +1,15 @@
+import csv
+import json
+from unittest.mock import patch
+
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, col, select
 
 from app.core.config import settings
+from app.models import Item
 from app.tests.utils.item import create_random_item
+from app.tests.utils.queries import assert_max_queries
+from app.tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -22,6 +29,37 @@ def test_create_item(
     assert "owner_id" in content
 
 
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    data = [{"title": f"Bulk {i}", "description": "Bulk"} for i in range(3)]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert len(ids) == 3
+    items = db.exec(select(Item).where(col(Item.id).in_(ids))).all()
+    assert sorted(item.title for item in items) == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+
+def test_create_items_bulk_too_many(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = [{"title": "Bulk"}] * 3
+    with patch("app.core.config.settings.ITEMS_BULK_MAX_SIZE", 2):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/bulk",
+            headers=superuser_token_headers,
+            json=data,
+        )
+    assert response.status_code == 400
+    content = response.json()
+    assert content["detail"] == "Too many items, at most 2 per request"
+
+
 def test_read_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -36,6 +74,43 @@ def test_read_item(
     assert content["description"] == item.description
     assert content["id"] == item.id
     assert content["owner_id"] == item.owner_id
+    # The current user (a few columns when cached) and the item
+    assert_max_queries(response, 2)
+
+
+def test_read_item_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["ETag"]
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    response = client.put(
+        url, headers=superuser_token_headers, json={"title": "Updated title"}
+    )
+    assert response.headers["ETag"] != etag
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+
+def test_read_items_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/?limit=5"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["ETag"]
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
 
 
 def test_read_item_not_found(
@@ -77,6 +152,301 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        create_random_item(db)
+    ids: list[int] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        ids.extend(item["id"] for item in content["data"])
+        if not content["next_cursor"]:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert ids == sorted(set(ids))
+    assert len(ids) == content["count"]
+
+
+def test_read_items_without_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"include_count": False},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] is None
+    assert content["count_exact"] is False
+
+
+def test_read_items_estimated_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"estimate_count": True},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 0
+    assert content["count_exact"] is False
+
+
+def test_read_items_estimated_count_with_filters(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # Bind parameter and quote characters must reach the database as values
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"estimate_count": True, "title_prefix": "a :x 'b"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 0
+    assert content["count_exact"] is False
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    content = response.json()
+    assert content["detail"] == "Invalid cursor"
+
+
+def test_read_items_filters(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    prefix = random_lower_string()
+    for data in [
+        {"title": f"{prefix} b", "description": "Described"},
+        {"title": f"{prefix} a", "description": ""},
+        {"title": f"{prefix} c"},
+        {"title": "Other", "description": "Described"},
+    ]:
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json=data,
+        )
+
+    def titles(**params: str | bool) -> list[str]:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            params={"title_prefix": prefix, **params},
+        )
+        assert response.status_code == 200
+        return [item["title"] for item in response.json()["data"]]
+
+    assert titles(sort="title") == [f"{prefix} a", f"{prefix} b", f"{prefix} c"]
+    assert titles(sort="-title") == [f"{prefix} c", f"{prefix} b", f"{prefix} a"]
+    assert titles(sort="title", has_description=True) == [f"{prefix} b"]
+    assert titles(sort="title", has_description=False) == [
+        f"{prefix} a",
+        f"{prefix} c",
+    ]
+    assert titles(title_prefix=f"{prefix}%") == []
+
+
+def test_read_items_sort_not_allowed(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"sort": "description"},
+    )
+    assert response.status_code == 422
+
+
+def test_read_items_sorted_by_title_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    prefix = random_lower_string()
+    for title in ["d", "b", "a", "c", "b"]:
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            json={"title": f"{prefix} {title}"},
+        )
+    items: list[tuple[str, int]] = []
+    params: dict[str, str | int] = {
+        "limit": 2,
+        "title_prefix": prefix,
+        "sort": "-title",
+    }
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        items.extend((item["title"], item["id"]) for item in content["data"])
+        if not content["next_cursor"]:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert len(items) == 5
+    assert items == sorted(items, reverse=True)
+
+
+def test_read_items_title_sort_rejects_id_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"sort": "title", "cursor": response.json()["next_cursor"]},
+    )
+    assert response.status_code == 400
+
+
+def test_read_items_by_owner(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"owner_id": item.owner_id},
+    )
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()["data"]] == [item.id]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"owner_id": item.owner_id},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough permissions"
+
+
+def test_export_items(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    for i in range(3):
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": f"Export {i}"},
+        )
+    count = client.get(
+        f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+    ).json()["count"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export", headers=normal_user_token_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == count
+    assert {"id", "title", "description", "owner_id"} == set(rows[0])
+    assert len({row["owner_id"] for row in rows}) == 1
+
+
+def test_export_items_csv(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Export, with comma", "description": "csv"},
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert "Export, with comma" in [row["title"] for row in rows]
+
+
+def test_search_items(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    word = random_lower_string()
+    ids = []
+    for headers, data in [
+        (normal_user_token_headers, {"title": "Chair", "description": f"A {word}"}),
+        (normal_user_token_headers, {"title": f"{word} lamp", "description": "Desk"}),
+        (superuser_token_headers, {"title": word}),
+    ]:
+        r = client.post(f"{settings.API_V1_STR}/items/", headers=headers, json=data)
+        ids.append(r.json()["id"])
+    url = f"{settings.API_V1_STR}/items/search"
+
+    response = client.get(url, headers=normal_user_token_headers, params={"q": word})
+    assert response.status_code == 200
+    content = response.json()
+    # Title matches rank first, other users' items are left out
+    assert [item["id"] for item in content["data"]] == [ids[1], ids[0]]
+    assert content["count"] == 2
+    assert content["count_exact"] is True
+
+    response = client.get(
+        url,
+        headers=normal_user_token_headers,
+        params={"q": word, "include_count": False},
+    )
+    content = response.json()
+    assert len(content["data"]) == 2
+    assert content["count"] is None
+    assert content["count_exact"] is False
+
+    response = client.get(url, headers=superuser_token_headers, params={"q": word})
+    assert {item["id"] for item in response.json()["data"]} == set(ids)
+
+    response = client.get(
+        url, headers=normal_user_token_headers, params={"q": f"{word} -lamp"}
+    )
+    assert [item["id"] for item in response.json()["data"]] == [ids[0]]
+
+
+def test_search_items_empty_query(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": ""},
+    )
+    assert response.status_code == 422
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -95,6 +465,45 @@ def test_update_item(
     assert content["owner_id"] == item.owner_id
 
 
+def test_update_item_precondition_failed(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    response = client.put(
+        url,
+        headers={**superuser_token_headers, "If-Match": etag},
+        json={"title": "First update"},
+    )
+    assert response.status_code == 200
+    response = client.put(
+        url,
+        headers={**superuser_token_headers, "If-Match": etag},
+        json={"title": "Second update"},
+    )
+    assert response.status_code == 412
+    content = response.json()
+    assert content["detail"] == "Item was modified"
+    db.refresh(item)
+    assert item.title == "First update"
+
+
+def test_update_item_weak_etag_precondition_failed(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    # If-Match compares strongly, e.g. the weak ETag of a compressed response
+    response = client.put(
+        url,
+        headers={**superuser_token_headers, "If-Match": f"W/{etag}"},
+        json={"title": "Updated title"},
+    )
+    assert response.status_code == 412
+
+
 def test_update_item_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -6,6 +6,7 @@ from sqlmodel import Session, select
 from app.core.config import settings
 from app.core.security import verify_password
 from app.models import User
+from app.tests.utils.utils import random_email
 from app.utils import generate_password_reset_token
 
 
@@ -30,6 +31,23 @@ def test_get_access_token_incorrect_password(client: TestClient) -> None:
     assert r.status_code == 400
 
 
+def test_get_access_token_throttled(client: TestClient) -> None:
+    login_data = {
+        "username": random_email(),
+        "password": "incorrect",
+    }
+    with (
+        patch("app.core.config.settings.LOGIN_THROTTLE_ACCOUNT_CAPACITY", 1),
+        patch("app.crud.async_authenticate", return_value=None) as authenticate,
+    ):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+        assert r.status_code == 400
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) > 0
+        assert authenticate.call_count == 1
+
+
 def test_use_access_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -5,8 +5,10 @@ from sqlmodel import Session, select
 
 from app import crud
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import get_password_hash, verify_password
 from app.models import User, UserCreate
+from app.tests.utils.queries import assert_max_queries
+from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -32,6 +34,17 @@ def test_get_users_normal_user_me(
     assert current_user["email"] == settings.EMAIL_TEST_USER
 
 
+def test_get_users_me_not_modified(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    r = client.get(url, headers=normal_user_token_headers)
+    etag = r.headers["ETag"]
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+
+
 def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -165,6 +178,44 @@ def test_retrieve_users(
     assert "count" in all_users
     for item in all_users["data"]:
         assert "email" in item
+        assert "hashed_password" not in item
+
+
+def test_retrieve_users_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        user_in = UserCreate(email=random_email(), password=random_lower_string())
+        crud.create_user(session=db, user_create=user_in)
+
+    first = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 2},
+    ).json()
+    assert len(first["data"]) == 2
+    assert first["next_cursor"]
+
+    second = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 2, "cursor": first["next_cursor"]},
+    ).json()
+    assert second["data"]
+    assert second["data"][0]["id"] > first["data"][-1]["id"]
+
+
+def test_retrieve_users_estimated_count(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"estimate_count": True},
+    )
+    all_users = r.json()
+    assert all_users["count"] >= 0
+    assert all_users["count_exact"] is False
 
 
 def test_update_user_me(
@@ -358,6 +409,8 @@ def test_update_user(
     updated_user = r.json()
 
     assert updated_user["full_name"] == "Updated_full_name"
+    # Current user (a few columns when cached), user, update and refresh
+    assert_max_queries(r, 4)
 
     user_query = select(User).where(User.email == username)
     user_db = db.exec(user_query).first()
@@ -366,6 +419,85 @@ def test_update_user(
     assert user_db.full_name == "Updated_full_name"
 
 
+def test_update_user_deactivate_cached_user(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
+def test_deactivated_in_other_worker_cached_user(
+    client: TestClient, db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    # Written without the app, its cache isn't invalidated
+    user.is_active = False
+    db.add(user)
+    db.commit()
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
+def test_update_password_me_changed_in_other_worker(
+    client: TestClient, db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    changed_password = random_lower_string()
+    user.hashed_password = get_password_hash(changed_password)
+    db.add(user)
+    db.commit()
+
+    data = {"current_password": password, "new_password": random_lower_string()}
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/password", headers=headers, json=data
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Incorrect password"
+    data["current_password"] = changed_password
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/password", headers=headers, json=data
+    )
+    assert r.status_code == 200
+
+
 def test_update_user_not_exists(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
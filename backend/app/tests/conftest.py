@@ -1,27 +1,70 @@
-from collections.abc import Generator
+import os
 
-import pytest
-from fastapi.testclient import TestClient
-from sqlmodel import Session, delete
+# Cheap bcrypt for every hash made during the tests, including the ones of the
+# password hashing processes, and the metrics on to test them. Set before the
+# settings are loaded by the imports.
+os.environ["PASSWORD_HASH_ROUNDS"] = "4"
+os.environ["METRICS_ENABLED"] = "true"
 
-from app.core.config import settings
-from app.core.db import engine, init_db
-from app.main import app
-from app.models import Item, User
-from app.tests.utils.user import authentication_token_from_email
-from app.tests.utils.utils import get_superuser_token_headers
+from collections.abc import Generator  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import async_engine, engine, init_db  # noqa: E402
+from app.core.throttle import MemoryThrottleBackend, login_throttle  # noqa: E402
+from app.main import app  # noqa: E402
+from app.tests.utils.db import TEST_SCHEMA, use_test_schema  # noqa: E402
+from app.tests.utils.user import authentication_token_from_email  # noqa: E402
+from app.tests.utils.utils import get_superuser_token_headers  # noqa: E402
 
 
 @pytest.fixture(scope="session", autouse=True)
-def db() -> Generator[Session, None, None]:
+def test_schema() -> Generator[str, None, None]:
+    """
+    Create the tables and the first superuser in a schema of this test worker,
+    dropped with everything in it at the end of the run.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{TEST_SCHEMA}" CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA "{TEST_SCHEMA}"'))
+    use_test_schema(engine)
+    use_test_schema(async_engine.sync_engine)
+    # Pooled connections were opened before the search path was set
+    engine.dispose()
+    # The schema is empty, don't let tables in public pass for existing ones
+    SQLModel.metadata.create_all(engine, checkfirst=False)
     with Session(engine) as session:
         init_db(session)
-        yield session
-        statement = delete(Item)
-        session.execute(statement)
-        statement = delete(User)
-        session.execute(statement)
-        session.commit()
+    yield TEST_SCHEMA
+    engine.dispose()
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{TEST_SCHEMA}" CASCADE'))
+
+
+@pytest.fixture
+def db() -> Generator[Session, None, None]:
+    """
+    Session in a transaction rolled back after the test. Commits only release a
+    savepoint, so nothing the test writes is seen by other tests or by the app.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(
+            bind=connection, join_transaction_mode="create_savepoint"
+        ) as session:
+            yield session
+        transaction.rollback()
+
+
+@pytest.fixture(autouse=True)
+def reset_login_throttle() -> None:
+    # Every test logs in with fresh buckets
+    if isinstance(login_throttle.backend, MemoryThrottleBackend):
+        login_throttle.backend.clear()
 
 
 @pytest.fixture(scope="module")
@@ -36,7 +79,8 @@ def superuser_token_headers(client: TestClient) -> dict[str, str]:
 
 
 @pytest.fixture(scope="module")
-def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]:
-    return authentication_token_from_email(
-        client=client, email=settings.EMAIL_TEST_USER, db=db
-    )
+def normal_user_token_headers(client: TestClient) -> dict[str, str]:
+    with Session(engine) as session:
+        return authentication_token_from_email(
+            client=client, email=settings.EMAIL_TEST_USER, db=session
+        )
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_cache_hit_and_miss() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=2, ttl=60)
+    assert cache.get(1) is None
+    cache.set(1, "one")
+    assert cache.get(1) == "one"
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=2, ttl=60)
+    cache.set(1, "one")
+    cache.set(2, "two")
+    cache.get(1)
+    cache.set(3, "three")
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=2, ttl=10)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set(1, "one")
+    with patch("app.core.cache.time.monotonic", return_value=109.0):
+        assert cache.get(1) == "one"
+    with patch("app.core.cache.time.monotonic", return_value=111.0):
+        assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidate() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=2, ttl=60)
+    cache.set(1, "one")
+    cache.invalidate(1)
+    cache.invalidate(2)
+    assert cache.get(1) is None
+
+
+def test_cache_disabled() -> None:
+    cache: TTLCache[int, str] = TTLCache(max_size=0, ttl=60)
+    cache.set(1, "one")
+    assert cache.get(1) is None
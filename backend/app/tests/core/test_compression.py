@@ -0,0 +1,84 @@
+import gzip
+from collections.abc import AsyncIterator
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.core.compression import (
+    CompressionMiddleware,
+    negotiate_encoding,
+    skip_compression,
+)
+from app.core.config import settings
+
+
+def test_negotiate_encoding() -> None:
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate_encoding("gzip, deflate, br", encodings) == "br"
+    assert negotiate_encoding("gzip, br;q=0.5", encodings) == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0.1", encodings) == "gzip"
+    assert negotiate_encoding("*", encodings) == "zstd"
+    assert negotiate_encoding("identity", encodings) is None
+    assert negotiate_encoding("", encodings) is None
+    assert negotiate_encoding("br", ["gzip"]) is None
+
+
+def test_compresses_openapi(client: TestClient) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/openapi.json", headers={"Accept-Encoding": "gzip"}
+    )
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.headers["Vary"] == "Accept-Encoding"
+    assert int(r.headers["Content-Length"]) < len(r.content)
+    assert r.json()["openapi"]
+
+
+def test_small_response_not_compressed() -> None:
+    async def small(_request: object) -> PlainTextResponse:
+        return PlainTextResponse("small")
+
+    app = Starlette(routes=[Route("/", small)])
+    app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+    r = TestClient(app).get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
+    assert r.text == "small"
+
+
+def test_streaming_response() -> None:
+    chunks = [b"line %d\n" % i * 50 for i in range(10)]
+
+    async def body() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    async def stream(_request: object) -> StreamingResponse:
+        return StreamingResponse(body(), media_type="text/plain")
+
+    @skip_compression
+    async def skipped(_request: object) -> StreamingResponse:
+        return StreamingResponse(body(), media_type="text/plain")
+
+    app = Starlette(routes=[Route("/", stream), Route("/skipped", skipped)])
+    app.add_middleware(CompressionMiddleware, encodings=["gzip"])
+    client = TestClient(app)
+    with client.stream("GET", "/", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["Content-Encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    assert gzip.decompress(raw) == b"".join(chunks)
+    assert len(raw) < len(b"".join(chunks))
+    r = client.get("/skipped", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
+
+
+def test_export_not_compressed(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers={**superuser_token_headers, "Accept-Encoding": "gzip"},
+    )
+    assert r.status_code == 200
+    assert "Content-Encoding" not in r.headers
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+from app.core.memory import memory_usage
+
+linux_only = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="reads /proc"
+)
+
+
+@linux_only
+def test_memory_usage_of_current_process() -> None:
+    usage = memory_usage()
+    assert usage is not None
+    assert usage.rss > 0
+    assert usage.private <= usage.rss
+    assert usage.pss <= usage.rss
+    assert memory_usage(os.getpid()) is not None
+
+
+def test_memory_usage_of_missing_process() -> None:
+    assert memory_usage(2**31 - 1) is None
+
+
+@linux_only
+def test_forked_child_shares_parent_pages() -> None:
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        usage = memory_usage()
+        os.write(write, b"1" if usage and usage.shared > usage.private else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
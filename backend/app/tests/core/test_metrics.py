@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core.config import Settings, settings
+from app.core.metrics import statement_type, status_class
+
+
+def test_statement_type() -> None:
+    assert statement_type("SELECT item.id FROM item") == "SELECT"
+    assert statement_type("\n  insert into item VALUES (1)") == "INSERT"
+    assert statement_type("WITH x AS (SELECT 1) SELECT * FROM x") == "OTHER"
+    assert statement_type("BEGIN") == "OTHER"
+
+
+def test_status_class() -> None:
+    assert status_class(200) == "2xx"
+    assert status_class(404) == "4xx"
+
+
+def test_metrics_endpoint(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    client.get("/not-a-route")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["Content-Type"].startswith("text/plain")
+    body = r.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'operation="items-read_items",status="2xx"}'
+    ) in body
+    assert 'operation="unmatched"' in body
+    assert "not-a-route" not in body
+    assert 'db_query_duration_seconds_count{engine="async",statement="SELECT"}' in body
+    assert "http_requests_in_progress" in body
+
+
+def test_metrics_token_required_outside_local() -> None:
+    deployed = {
+        "ENVIRONMENT": "production",
+        "SECRET_KEY": "secret",
+        "POSTGRES_PASSWORD": "secret",
+        "FIRST_SUPERUSER_PASSWORD": "secret",
+        "PASSWORD_HASH_ROUNDS": 12,
+    }
+    with pytest.raises(ValidationError, match="METRICS_TOKEN"):
+        Settings(**deployed, METRICS_ENABLED=True)  # type: ignore[arg-type]
+    Settings(**deployed, METRICS_ENABLED=True, METRICS_TOKEN="token")  # type: ignore[arg-type]
+    Settings(**deployed, METRICS_ENABLED=False)  # type: ignore[arg-type]
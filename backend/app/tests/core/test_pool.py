@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+
+from app.core.config import settings
+from app.core.pool import WAIT_BUCKETS, TimedQueuePool, WaitHistogram, pool_stats
+
+
+def test_wait_histogram_buckets() -> None:
+    histogram = WaitHistogram()
+    histogram.observe(0.0005)
+    histogram.observe(0.02)
+    histogram.observe(60)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[WAIT_BUCKETS.index(0.05)] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.total == pytest.approx(60.0205)
+
+
+def test_timed_pool_counts_checkouts_and_timeouts() -> None:
+    engine = create_engine(
+        "sqlite://",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    with engine.connect():
+        stats = pool_stats("test", engine)
+        assert stats.checked_out == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    stats = pool_stats("test", engine)
+    assert stats.checked_out == 0
+    assert stats.checked_in == 1
+    assert stats.waits == 2
+    assert stats.timeouts == 1
+    assert stats.wait_histogram[-1].le is None
+    engine.dispose()
+
+
+def test_read_db_pool_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["pid"]
+    names = [pool["name"] for pool in stats["pools"]]
+    assert names[:2] == ["sync", "async"]
+    assert stats["pools"][0]["size"] == settings.DATABASE_POOL_SIZE
+
+
+def test_read_db_pool_stats_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.queries import QueryCounterMiddleware, instrument_engine, track_queries
+
+engine = create_engine("sqlite://")
+instrument_engine(engine, "test")
+
+
+def test_track_queries() -> None:
+    with track_queries() as stats, engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.duration > 0
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert stats.count == 2
+
+
+def test_failed_statement_error_reaches_caller() -> None:
+    with track_queries() as stats, engine.connect() as connection:
+        connection.execute(text("CREATE TABLE unique_ids (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO unique_ids VALUES (1)"))
+        with pytest.raises(exc.IntegrityError):
+            connection.execute(text("INSERT INTO unique_ids VALUES (1)"))
+        assert connection.info["query_start_time"] == []
+        connection.execute(text("SELECT 1"))
+    assert stats.count == 3
+
+
+def test_server_timing_and_warnings(caplog: pytest.LogCaptureFixture) -> None:
+    def endpoint(request: Request) -> PlainTextResponse:
+        with engine.connect() as connection:
+            for _ in range(int(request.query_params["n"])):
+                connection.execute(text("SELECT 1"))
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(QueryCounterMiddleware, budget=3, repeat_threshold=3)
+    client = TestClient(app)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.queries"):
+        r = client.get("/", params={"n": 2})
+        assert r.headers["Server-Timing"].startswith("db;dur=")
+        assert r.headers["Server-Timing"].endswith('desc="2 queries"')
+        assert not caplog.records
+
+        r = client.get("/", params={"n": 4})
+        assert r.headers["Server-Timing"].endswith('desc="4 queries"')
+    messages = [record.getMessage() for record in caplog.records]
+    assert "GET endpoint ran 4 queries, over the budget of 3" in messages
+    assert any("possible N+1: SELECT 1" in message for message in messages)
@@ -0,0 +1,102 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.replicas import PRIMARY_COOKIE, ReplicaRouter, StickyPrimaryMiddleware
+
+
+def engines(n: int) -> list[Any]:
+    return [object() for _ in range(n)]
+
+
+def test_round_robin() -> None:
+    primary, replicas = object(), engines(2)
+    router = ReplicaRouter(primary, replicas)  # type: ignore[arg-type]
+    picked = []
+    for _ in range(4):
+        with router.engine() as engine:
+            picked.append(engine)
+    assert picked == replicas * 2
+
+
+def test_least_connections() -> None:
+    primary, replicas = object(), engines(2)
+    router = ReplicaRouter(
+        primary,  # type: ignore[arg-type]
+        replicas,
+        strategy="least_connections",
+    )
+    with router.engine() as first:
+        with router.engine() as second:
+            assert {first, second} == set(replicas)
+            assert router.in_use == [1, 1]
+        with router.engine() as third:
+            assert third is second
+    assert router.in_use == [0, 0]
+
+
+def test_primary_without_replicas_or_when_asked() -> None:
+    primary = object()
+    with ReplicaRouter(primary, []).engine() as engine:  # type: ignore[arg-type]
+        assert engine is primary
+    router = ReplicaRouter(primary, engines(1))  # type: ignore[arg-type]
+    with router.engine(primary=True) as engine:
+        assert engine is primary
+    assert router.in_use == [0]
+
+
+def test_reads_from_sqlite_replicas(tmp_path: Path) -> None:
+    pytest.importorskip("aiosqlite")
+
+    async def read(engine: AsyncEngine) -> str:
+        async with engine.connect() as connection:
+            return str((await connection.execute(text("SELECT name FROM db"))).scalar())
+
+    async def run() -> list[str]:
+        replicas = []
+        for name in ("one", "two"):
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+            async with engine.begin() as connection:
+                await connection.execute(text("CREATE TABLE db (name TEXT)"))
+                await connection.execute(text(f"INSERT INTO db VALUES ('{name}')"))
+            replicas.append(engine)
+        router = ReplicaRouter(replicas[0], replicas)
+        names = []
+        for _ in range(3):
+            with router.engine() as engine:
+                names.append(await read(engine))
+        for engine in replicas:
+            await engine.dispose()
+        return names
+
+    assert asyncio.run(run()) == ["one", "two", "one"]
+
+
+def test_sticky_primary_cookie_after_write() -> None:
+    async def endpoint(_request: object) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    async def failing(_request: object) -> PlainTextResponse:
+        return PlainTextResponse("no", status_code=400)
+
+    app = Starlette(
+        routes=[
+            Route("/", endpoint, methods=["GET", "POST"]),
+            Route("/failing", failing, methods=["POST"]),
+        ]
+    )
+    app.add_middleware(StickyPrimaryMiddleware, seconds=5)
+    client = TestClient(app)
+    assert PRIMARY_COOKIE not in client.get("/").cookies
+    assert PRIMARY_COOKIE not in client.post("/failing").cookies
+    r = client.post("/")
+    assert r.cookies[PRIMARY_COOKIE] == "1"
+    assert "Max-Age=5" in r.headers["Set-Cookie"]
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from app.core.security import PasswordHasher, PasswordHashingBusy
+
+
+def test_password_hasher_inline() -> None:
+    hasher = PasswordHasher(workers=0, queue_limit=0)
+    hashed_password = hasher.hash("secret-password")
+    assert hasher.verify("secret-password", hashed_password)
+    assert not hasher.verify("other-password", hashed_password)
+
+
+def test_password_hasher_process_pool() -> None:
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    try:
+        hashed_password = asyncio.run(hasher.async_hash("secret-password"))
+        assert hasher.verify("secret-password", hashed_password)
+        assert not asyncio.run(hasher.async_verify("other-password", hashed_password))
+    finally:
+        hasher.shutdown()
+
+
+def test_password_hasher_queue_limit() -> None:
+    hasher = PasswordHasher(workers=1, queue_limit=0)
+    # Take the only slot as if a hash was already running
+    hasher._slots.acquire()
+    with pytest.raises(PasswordHashingBusy):
+        hasher.hash("secret-password")
+    hasher.shutdown()
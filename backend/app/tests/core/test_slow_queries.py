@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.slow_queries import SlowQueryLog, fingerprint
+
+
+def test_fingerprint() -> None:
+    assert (
+        fingerprint(
+            "SELECT item.id FROM item\n WHERE item.owner_id = %(owner_id_1)s "
+            "AND item.title = 'it''s' AND item.id IN (%(id_1_1)s, %(id_1_2)s) "
+            "LIMIT 10"
+        )
+        == "SELECT item.id FROM item WHERE item.owner_id = ? AND item.title = ? "
+        "AND item.id IN (...) LIMIT ?"
+    )
+    assert fingerprint(
+        "INSERT INTO item (title) VALUES (%(title__0)s), (%(title__1)s)"
+    ) == fingerprint("INSERT INTO item (title) VALUES (%(title__0)s)")
+    assert fingerprint("SELECT x::text FROM t1") == "SELECT x::text FROM t1"
+
+
+def test_records_only_slow_queries() -> None:
+    log = SlowQueryLog(threshold=0.1)
+    log.record("SELECT 1", None, 0.05, "GET read_items")
+    log.record("SELECT * FROM item WHERE id = 1", {"id": 1}, 0.2, "GET read_item")
+    log.record("SELECT * FROM item WHERE id = 2", None, 0.3, "GET read_item")
+    log.record("SELECT * FROM user", None, 0.4, None)
+    assert [query.duration for query in log.latest()] == [0.4, 0.3, 0.2]
+    assert log.latest()[-1].parameters == "{'id': 1}"
+    top = log.top(1)
+    assert top[0].fingerprint == "SELECT * FROM item WHERE id = ?"
+    assert top[0].calls == 2
+    assert top[0].max == 0.3
+    assert top[0].last_route == "GET read_item"
+
+
+def test_disabled_and_bounded() -> None:
+    disabled = SlowQueryLog(threshold=None)
+    assert not disabled.enabled
+    disabled.record("SELECT 1", None, 10, None)
+    assert not disabled.latest()
+
+    log = SlowQueryLog(threshold=0, max_fingerprints=2, log_parameters=False)
+    log.record("SELECT a FROM t", {"secret": "x"}, 1, None)
+    log.record("SELECT b FROM t", None, 3, None)
+    log.record("SELECT c FROM t", None, 2, None)
+    assert [entry.fingerprint for entry in log.top(5)] == [
+        "SELECT b FROM t",
+        "SELECT c FROM t",
+    ]
+    assert all(query.parameters is None for query in log.latest())
+
+
+def test_read_slow_queries(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/slow-queries/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    assert r.json()["threshold"] == settings.SLOW_QUERY_THRESHOLD
@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import patch
+
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import col, select
+
+from app.core.config import settings
+from app.core.throttle import (
+    DatabaseThrottleBackend,
+    MemoryThrottleBackend,
+    take_token,
+)
+from app.models import ThrottleBucket
+from app.tests.utils.db import use_test_schema
+from app.tests.utils.utils import random_lower_string
+
+
+def test_take_token() -> None:
+    assert take_token(tokens=2, elapsed=0, capacity=2, rate=1) == (1, 0)
+    assert take_token(tokens=0, elapsed=0.5, capacity=2, rate=1) == (0.5, 0.5)
+    assert take_token(tokens=0, elapsed=60, capacity=2, rate=1) == (1, 0)
+
+
+def test_memory_backend_refills() -> None:
+    backend = MemoryThrottleBackend()
+    with patch("app.core.throttle.time.monotonic", return_value=100.0):
+        assert asyncio.run(backend.take("key", capacity=1, rate=0.5)) == 0
+        assert asyncio.run(backend.take("key", capacity=1, rate=0.5)) == 2
+        assert asyncio.run(backend.take("other", capacity=1, rate=0.5)) == 0
+    with patch("app.core.throttle.time.monotonic", return_value=102.0):
+        assert asyncio.run(backend.take("key", capacity=1, rate=0.5)) == 0
+
+
+def test_memory_backend_max_keys() -> None:
+    backend = MemoryThrottleBackend(max_keys=1)
+    asyncio.run(backend.take("first", capacity=1, rate=1))
+    asyncio.run(backend.take("second", capacity=1, rate=1))
+    assert asyncio.run(backend.take("first", capacity=1, rate=1)) == 0
+
+
+def test_database_backend() -> None:
+    # Own engine, pooled async connections can't outlive this event loop
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=NullPool
+    )
+    use_test_schema(engine.sync_engine)
+    backend = DatabaseThrottleBackend(engine, max_idle=3600)
+    key = random_lower_string()
+    assert asyncio.run(backend.take(key, capacity=1, rate=0.01)) == 0
+    assert asyncio.run(backend.take(key, capacity=1, rate=0.01)) > 90
+
+
+def test_database_backend_deletes_idle_buckets() -> None:
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=NullPool
+    )
+    use_test_schema(engine.sync_engine)
+    backend = DatabaseThrottleBackend(engine, max_idle=0.2, cleanup_interval=0)
+    idle, active = random_lower_string(), random_lower_string()
+
+    async def keys() -> set[str]:
+        async with engine.connect() as connection:
+            statement = select(ThrottleBucket.key).where(
+                col(ThrottleBucket.key).in_([idle, active])
+            )
+            return set((await connection.execute(statement)).scalars())
+
+    async def run() -> tuple[set[str], set[str]]:
+        await backend.take(idle, capacity=1, rate=1)
+        before = await keys()
+        await asyncio.sleep(0.3)
+        await backend.take(active, capacity=1, rate=1)
+        return before, await keys()
+
+    before, after = asyncio.run(run())
+    assert before == {idle}
+    assert after == {active}
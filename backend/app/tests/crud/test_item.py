@@ -0,0 +1,34 @@
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import crud
+from app.models import Item, User
+
+
+def test_search_items_without_postgres() -> None:
+    engine = create_engine("sqlite://")
+    # The GIN search index is only created on PostgreSQL
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(email="search@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.add_all(
+            [
+                Item(title="Desk lamp", description="50% off", owner_id=user.id),
+                Item(title="Lamp", description="For the desk", owner_id=user.id),
+                Item(title="Desk", description=None, owner_id=user.id),
+            ]
+        )
+        session.commit()
+
+        def search(query: str) -> list[str]:
+            statement = crud.search_items(
+                statement=select(Item), query=query, dialect="sqlite"
+            )
+            return [item.title for item in session.exec(statement)]
+
+        assert search("LAMP desk") == ["Desk lamp", "Lamp"]
+        assert search("desk") == ["Desk lamp", "Lamp", "Desk"]
+        # LIKE wildcards in the query are matched literally
+        assert search("50%") == ["Desk lamp"]
+        assert search("%") == ["Desk lamp"]
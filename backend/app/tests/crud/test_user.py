@@ -4,6 +4,7 @@ from sqlmodel import Session
 from app import crud
 from app.core.security import verify_password
 from app.models import User, UserCreate, UserUpdate
+from app.tests.utils.queries import assert_num_queries
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -76,6 +77,15 @@ def test_get_user(db: Session) -> None:
     assert jsonable_encoder(user) == jsonable_encoder(user_2)
 
 
+def test_get_user_by_email_queries(db: Session) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email, password=random_lower_string())
+    crud.create_user(session=db, user_create=user_in)
+    with assert_num_queries(1):
+        user = crud.get_user_by_email(session=db, email=email)
+    assert user
+
+
 def test_update_user(db: Session) -> None:
     password = random_lower_string()
     email = random_email()
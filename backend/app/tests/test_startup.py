@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+# CPU seconds to import app.main in a new interpreter, raise it with
+# IMPORT_TIME_BUDGET on slow machines. CPU time rather than wall clock time, so
+# it holds when the tests run in parallel, e.g. with pytest -n auto
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "2.5"))
+# Only imported on first use, never while the app starts
+LAZY_MODULES = ["emails", "jinja2", "passlib", "bcrypt"]
+if not os.environ.get("SENTRY_DSN"):
+    LAZY_MODULES.append("sentry_sdk")
+
+IMPORT_APP = f"""
+import json, sys, time
+start = time.process_time()
+import app.main
+cpu = time.process_time() - start
+loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"cpu": cpu, "loaded": loaded}}))
+"""
+
+
+def import_app() -> tuple[float, list[str], dict[str, float]]:
+    """
+    Import app.main with `python -X importtime` in a new process. Returns the
+    CPU seconds it took, the LAZY_MODULES that were imported, and the cumulative
+    import time in seconds of each module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_APP],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1e6
+    report = json.loads(result.stdout)
+    return report["cpu"], report["loaded"], cumulative
+
+
+def test_app_import_time() -> None:
+    cpu, _, cumulative = import_app()
+    slowest = sorted(cumulative.items(), key=lambda m: m[1], reverse=True)[:15]
+    report = "\n".join(f"{seconds:8.3f}s  {name}" for name, seconds in slowest)
+    assert cpu <= IMPORT_TIME_BUDGET, (
+        f"importing app.main took {cpu:.2f}s of CPU time, over the "
+        f"{IMPORT_TIME_BUDGET}s budget. Slowest imports:\n{report}"
+    )
+
+
+def test_heavy_modules_imported_lazily() -> None:
+    _, imported, _ = import_app()
+    assert not imported, f"imported while starting the app: {imported}"
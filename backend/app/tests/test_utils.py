@@ -0,0 +1,93 @@
+import time
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+
+from app.tests.utils.smtp import SMTPServer, smtp_server
+from app.utils import (
+    EmailDelivery,
+    EmailDispatcher,
+    EmailQueueFull,
+    generate_reset_password_email,
+)
+
+
+def wait_for_status(delivery: EmailDelivery, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while delivery.status == "queued" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def smtp() -> Generator[SMTPServer, None, None]:
+    with (
+        smtp_server() as server,
+        patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+        patch("app.core.config.settings.SMTP_PORT", server.server_address[1]),
+        patch("app.core.config.settings.SMTP_TLS", False),
+        patch("app.core.config.settings.SMTP_USER", None),
+        patch("app.core.config.settings.SMTP_PASSWORD", None),
+    ):
+        yield server
+
+
+def test_email_dispatcher_sends(smtp: SMTPServer) -> None:
+    dispatcher = EmailDispatcher(max_size=10, workers=1, max_attempts=1, backoff=0)
+    delivery = dispatcher.enqueue(
+        email_to="user@example.com", subject="Hello", html_content="<p>Hi</p>"
+    )
+    wait_for_status(delivery)
+    dispatcher.stop()
+    assert delivery.status == "sent"
+    assert delivery.attempts == 1
+    assert delivery.html_content == ""
+    assert len(smtp.messages) == 1
+    assert smtp.messages[0]["To"] == "user@example.com"
+    assert smtp.messages[0]["Subject"] == "Hello"
+
+
+def test_email_dispatcher_retries(smtp: SMTPServer) -> None:
+    dispatcher = EmailDispatcher(max_size=10, workers=1, max_attempts=3, backoff=0.01)
+    with patch("app.core.config.settings.SMTP_PORT", 1):
+        delivery = dispatcher.enqueue(
+            email_to="user@example.com", subject="Hello", html_content="<p>Hi</p>"
+        )
+        wait_for_status(delivery)
+    dispatcher.stop()
+    assert delivery.status == "failed"
+    assert delivery.attempts == 3
+    assert delivery.error
+    assert not smtp.messages
+
+
+def test_email_dispatcher_stop_fails_pending_retries(smtp: SMTPServer) -> None:
+    dispatcher = EmailDispatcher(max_size=10, workers=1, max_attempts=3, backoff=60)
+    with patch("app.core.config.settings.SMTP_PORT", 1):
+        delivery = dispatcher.enqueue(
+            email_to="user@example.com", subject="Hello", html_content="<p>Hi</p>"
+        )
+        deadline = time.monotonic() + 5
+        while not delivery.attempts and time.monotonic() < deadline:
+            time.sleep(0.01)
+    dispatcher.stop()
+    assert delivery.status == "failed"
+    assert delivery.attempts == 1
+    assert delivery.error
+    assert delivery.html_content == ""
+    assert not smtp.messages
+
+
+def test_email_dispatcher_queue_full() -> None:
+    dispatcher = EmailDispatcher(max_size=1, workers=0, max_attempts=1, backoff=0)
+    dispatcher.enqueue(email_to="user@example.com", subject="", html_content="")
+    with pytest.raises(EmailQueueFull):
+        dispatcher.enqueue(email_to="user@example.com", subject="", html_content="")
+
+
+def test_generate_reset_password_email() -> None:
+    email_data = generate_reset_password_email(
+        email_to="user@example.com", email="user@example.com", token="token"
+    )
+    assert "user@example.com" in email_data.subject
+    assert "reset-password?token=token" in email_data.html_content
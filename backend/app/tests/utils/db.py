@@ -0,0 +1,24 @@
+import os
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+# Each pytest-xdist worker gets its own schema, so parallel runs never share rows
+TEST_SCHEMA = f"test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+
+def use_test_schema(engine: Engine) -> None:
+    """
+    Make new connections of `engine`, the `sync_engine` of an async one, create
+    and find tables in TEST_SCHEMA. Extensions stay reachable in `public`.
+    """
+
+    @event.listens_for(engine, "connect", insert=True)
+    def set_search_path(dbapi_connection: Any, _connection_record: Any) -> None:
+        # Outside a transaction, so the pool's rollback on checkin doesn't undo it
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET search_path TO "{TEST_SCHEMA}", public')
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
@@ -0,0 +1,35 @@
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import httpx
+
+from app.core.queries import QueryStats, track_queries
+
+
+def query_count(response: httpx.Response) -> int:
+    """
+    Statements the request ran, from the `Server-Timing` header of its response.
+    """
+    match = re.search(
+        r'db;[^,]*desc="(\d+) queries"', response.headers["Server-Timing"]
+    )
+    assert match, response.headers["Server-Timing"]
+    return int(match.group(1))
+
+
+def assert_max_queries(response: httpx.Response, expected: int) -> None:
+    count = query_count(response)
+    assert count <= expected, f"{count} queries, expected at most {expected}"
+
+
+@contextmanager
+def assert_num_queries(expected: int) -> Iterator[QueryStats]:
+    """
+    Check the code run in the block, in this thread, runs `expected` statements.
+    """
+    with track_queries() as stats:
+        yield stats
+    assert (
+        stats.count == expected
+    ), f"{stats.count} queries, expected {expected}: {list(stats.statements)}"
@@ -1,15 +1,29 @@
+import base64
+import hashlib
 import logging
-from dataclasses import dataclass
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Literal
+from uuid import uuid4
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
 from app.core.config import settings
+from app.core.metrics import EMAIL_SEND_DURATION, EMAILS_SENT
+from app.models import Cursor
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -18,11 +32,29 @@ class EmailData:
     subject: str
 
 
+@cache
+def get_email_templates() -> "Environment":
+    # Compiled templates stay in memory, their bytecode is cached on disk so that
+    # new worker processes skip the Jinja compilation. Jinja is imported on first
+    # use, processes that send no email never load it.
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+        bytecode_cache=FileSystemBytecodeCache(settings.EMAIL_TEMPLATES_CACHE_DIR),
+        auto_reload=False,
+    )
+
+
+def load_email_templates() -> None:
+    email_templates = get_email_templates()
+    for template_name in email_templates.list_templates():
+        email_templates.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    template = get_email_templates().get_template(template_name)
+    html_content = template.render(context)
     return html_content
 
 
@@ -33,6 +65,8 @@ def send_email(
     html_content: str = "",
 ) -> None:
     assert settings.emails_enabled, "no provided configuration for email variables"
+    import emails  # type: ignore
+
     message = emails.Message(
         subject=subject,
         html=html_content,
@@ -49,6 +83,169 @@ def send_email(
         smtp_options["password"] = settings.SMTP_PASSWORD
     response = message.send(to=email_to, smtp=smtp_options)
     logging.info(f"send email result: {response}")
+    if not response.success:
+        raise smtplib.SMTPException(f"send email failed: {response.error or response}")
+
+
+class EmailQueueFull(Exception):
+    """
+    The email queue already holds EMAIL_QUEUE_SIZE messages.
+    """
+
+
+@dataclass
+class EmailDelivery:
+    email_to: str
+    subject: str
+    html_content: str
+    id: str = field(default_factory=lambda: uuid4().hex)
+    status: Literal["queued", "sent", "failed"] = "queued"
+    attempts: int = 0
+    error: str | None = None
+
+
+class EmailDispatcher:
+    """
+    Sends emails from a bounded queue in background threads, so request handlers
+    never wait on the SMTP server.
+
+    A failed send is retried after `backoff` seconds, doubling on every attempt, up
+    to `max_attempts` attempts. The latest `log_size` deliveries are kept with their
+    status, their body only until it was sent or failed for good.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        workers: int,
+        max_attempts: int,
+        backoff: float,
+        log_size: int = 100,
+    ) -> None:
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.log: deque[EmailDelivery] = deque(maxlen=log_size)
+        self._queue: queue.Queue[EmailDelivery | None] = queue.Queue(max_size)
+        self._threads: list[threading.Thread] = []
+        self._retries: dict[threading.Timer, EmailDelivery] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Send what is already queued, then stop the workers. Pending retries are dropped
+        and their deliveries marked failed.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            for timer, delivery in self._retries.items():
+                timer.cancel()
+                self._drop(delivery)
+            self._retries.clear()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def enqueue(
+        self, *, email_to: str, subject: str, html_content: str
+    ) -> EmailDelivery:
+        self.start()
+        delivery = EmailDelivery(
+            email_to=email_to, subject=subject, html_content=html_content
+        )
+        try:
+            self._queue.put_nowait(delivery)
+        except queue.Full:
+            raise EmailQueueFull()
+        self.log.append(delivery)
+        logger.info(f"email {delivery.id} to {email_to} queued")
+        return delivery
+
+    def _work(self) -> None:
+        while (delivery := self._queue.get()) is not None:
+            self._deliver(delivery)
+
+    def _deliver(self, delivery: EmailDelivery) -> None:
+        delivery.attempts += 1
+        start = time.perf_counter()
+        try:
+            send_email(
+                email_to=delivery.email_to,
+                subject=delivery.subject,
+                html_content=delivery.html_content,
+            )
+        except Exception as e:
+            EMAIL_SEND_DURATION.labels("error").observe(time.perf_counter() - start)
+            EMAILS_SENT.labels("error").inc()
+            delivery.error = str(e)
+            if delivery.attempts >= self.max_attempts:
+                self._finish(delivery, "failed")
+                logger.error(f"email {delivery.id} failed: {e}")
+                return
+            delay = self.backoff * 2 ** (delivery.attempts - 1)
+            logger.warning(f"email {delivery.id} failed, retrying in {delay}s: {e}")
+            self._retry_later(delivery, delay)
+            return
+        EMAIL_SEND_DURATION.labels("sent").observe(time.perf_counter() - start)
+        EMAILS_SENT.labels("sent").inc()
+        delivery.error = None
+        self._finish(delivery, "sent")
+        logger.info(f"email {delivery.id} sent")
+
+    def _retry_later(self, delivery: EmailDelivery, delay: float) -> None:
+        def retry() -> None:
+            # Queued under the lock, so it is ahead of the stop() sentinels
+            with self._lock:
+                # Already marked failed by stop()
+                if self._retries.pop(timer, None) is None:
+                    return
+                try:
+                    self._queue.put_nowait(delivery)
+                except queue.Full:
+                    self._finish(delivery, "failed")
+                    logger.error(f"email {delivery.id} failed, queue full on retry")
+
+        timer = threading.Timer(delay, retry)
+        timer.daemon = True
+        with self._lock:
+            if not self._threads:
+                # Failed while stop() was running, nothing would resend it
+                self._drop(delivery)
+                return
+            self._retries[timer] = delivery
+        timer.start()
+
+    @classmethod
+    def _drop(cls, delivery: EmailDelivery) -> None:
+        delivery.error = "Dropped before its retry, the dispatcher stopped"
+        cls._finish(delivery, "failed")
+        logger.error(f"email {delivery.id} failed, dropped before its retry")
+
+    @staticmethod
+    def _finish(delivery: EmailDelivery, status: Literal["sent", "failed"]) -> None:
+        # It can hold a new account password or a password reset token, not
+        # needed once there is nothing left to send
+        delivery.html_content = ""
+        delivery.status = status
+
+
+email_dispatcher = EmailDispatcher(
+    max_size=settings.EMAIL_QUEUE_SIZE,
+    workers=settings.EMAIL_WORKERS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    backoff=settings.EMAIL_RETRY_BACKOFF,
+)
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -115,3 +312,34 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    value = cursor.model_dump_json(exclude_none=True)
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(value: str) -> Cursor | None:
+    try:
+        return Cursor.model_validate_json(base64.urlsafe_b64decode(value))
+    except ValueError:
+        return None
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(header: str | None, etag: str, *, weak: bool = True) -> bool:
+    """
+    Whether an If-None-Match or If-Match header lists `etag`, or is `*`.
+    If-None-Match compares weakly, ignoring `W/`. If-Match needs `weak=False`:
+    a weak ETag in the header never matches.
+    """
+    if not header:
+        return False
+    etags = {value.strip() for value in header.split(",")}
+    if weak:
+        etags = {value.removeprefix("W/") for value in etags}
+    return "*" in etags or etag in etags
@@ -8,3 +8,9 @@ alembic upgrade head
 
 # Create initial data in DB
 python /app/app/initial_data.py
+
+# Start with empty metric files when the workers share them
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi